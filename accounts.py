@@ -0,0 +1,115 @@
+import contextvars
+import json
+import os
+from contextlib import contextmanager
+
+import exceptions
+
+REQUIRED_FIELDS = ('token', 'chat_id')
+
+current_account = contextvars.ContextVar('current_account', default=None)
+
+
+class Account:
+    """Учётная запись студента: токен Практикума, чат и состояние опроса.
+
+    На процесс приходятся сотни тысяч аккаунтов, поэтому у записи нет
+    __dict__, заголовки запроса собираются при обращении, а список
+    несохранённых статусов заводится только при первом изменении.
+    failures и idle — счётчики расписания (см. scheduler.Scheduler),
+    saved_cursor — курсор, уже записанный в хранилище состояния.
+    """
+
+    __slots__ = ('name', 'token', 'chat_id', 'cursor', 'saved_cursor',
+                 'statuses', 'pending', 'last_error', 'failures', 'idle')
+
+    def __init__(self, name, token, chat_id):
+        """Создать аккаунт с пустым курсором и без известных статусов."""
+        self.name = name
+        self.token = token
+        self.chat_id = chat_id
+        self.cursor = self.saved_cursor = 0
+        self.statuses = {}
+        self.pending = None
+        self.last_error = None
+        self.failures = 0
+        self.idle = 0
+
+    def __repr__(self):
+        """Короткое представление аккаунта без токена."""
+        return f'Account({self.name!r})'
+
+    @property
+    def headers(self):
+        """Заголовки запроса к API Практикума."""
+        return {'Authorization': f'OAuth {self.token}'}
+
+    def remember(self, homework, status):
+        """Запомнить отправленный статус работы до сохранения состояния."""
+        self.statuses[homework] = status
+        if self.pending is None:
+            self.pending = []
+        self.pending.append((homework, status))
+
+    def saved(self):
+        """Вернуть и забыть статусы, ожидающие сохранения."""
+        pending, self.pending = self.pending or (), None
+        return pending
+
+
+@contextmanager
+def activate(account):
+    """Сделать аккаунт текущим для запросов к API и отправки сообщений."""
+    token = current_account.set(account)
+    try:
+        yield account
+    finally:
+        current_account.reset(token)
+
+
+def _read_entries(path):
+    """Прочитать записи аккаунтов из JSON-файла."""
+    try:
+        with open(path, encoding='utf-8') as registry_file:
+            data = json.load(registry_file)
+    except (OSError, ValueError) as error:
+        raise exceptions.AccountsConfigError(
+            f'Не удалось прочитать реестр {path}: {error}')
+    if isinstance(data, dict):
+        data = [data]
+    if not isinstance(data, list):
+        raise exceptions.AccountsConfigError(
+            f'Реестр {path} должен содержать объект или список')
+    return data
+
+
+def load_accounts(path):
+    """Загрузить аккаунты из JSON-файла или каталога JSON-файлов."""
+    if os.path.isdir(path):
+        files = [os.path.join(path, name) for name in sorted(os.listdir(path))
+                 if name.endswith('.json')]
+    else:
+        files = [path]
+    registry = []
+    names = set()
+    for file_path in files:
+        stem = os.path.splitext(os.path.basename(file_path))[0]
+        for index, entry in enumerate(_read_entries(file_path)):
+            if not isinstance(entry, dict):
+                raise exceptions.AccountsConfigError(
+                    f'Запись {index} в {file_path} не является объектом')
+            missing = [key for key in REQUIRED_FIELDS if not entry.get(key)]
+            if missing:
+                raise exceptions.AccountsConfigError(
+                    f'В записи {index} в {file_path} нет полей: '
+                    f'{", ".join(missing)}')
+            name = str(entry.get('name') or f'{stem}-{index}')
+            if name in names:
+                raise exceptions.AccountsConfigError(
+                    f'Повторяющееся имя аккаунта: {name}')
+            names.add(name)
+            registry.append(
+                Account(name, entry['token'], str(entry['chat_id'])))
+    if not registry:
+        raise exceptions.AccountsConfigError(f'Реестр {path} пуст')
+    return registry
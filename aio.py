@@ -0,0 +1,135 @@
+import asyncio
+import contextvars
+import logging
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import accounts
+import exceptions
+import scheduler
+
+
+class AsyncEngine:
+    """Опрос аккаунтов на одном цикле событий.
+
+    Запросы к API выполняются в ограниченном пуле потоков, поэтому
+    ожидание сети одних аккаунтов перекрывается с работой других. Проверка
+    и разбор ответа идут теми же функциями, что и в синхронном режиме, а
+    сообщения ставятся в очередь отправки вызовом send(name, chat_id, text).
+    """
+
+    def __init__(self, fetch, handle_response, handle_error, send,
+                 concurrency=64, stats=None, health=None, profiler=None):
+        """Запомнить обработчики цикла и создать пул потоков."""
+        self.fetch = fetch
+        self.handle_response = handle_response
+        self.handle_error = handle_error
+        self.send = send
+        self.concurrency = concurrency
+        self.executor = ThreadPoolExecutor(max_workers=concurrency)
+        self.semaphore = None
+        self.stats = stats if stats is not None else Counter()
+        self.health = health
+        self.profiler = profiler
+
+    async def _offload(self, func, *args):
+        """Выполнить блокирующую функцию в пуле, сохранив контекст."""
+        loop = asyncio.get_running_loop()
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(
+            self.executor, context.run, func, *args)
+
+    async def get_api_answer(self, timestamp):
+        """Асинхронная обёртка над get_api_answer."""
+        return await self._offload(self.fetch, timestamp)
+
+    @staticmethod
+    def admit(account, plan, deadline, stopper):
+        """Разрешить опрос аккаунта или вернуть его в расписание.
+
+        Возвращает True, если опрос разрешён, False, если исчерпан бюджет
+        цикла, и None после сигнала остановки.
+        """
+        allowed = True
+        if stopper is not None and stopper.requested:
+            allowed = None
+        elif deadline is not None:
+            try:
+                deadline.check('опрос API')
+            except exceptions.DeadlineExceeded as error:
+                logging.debug('%s: %s', account, error)
+                allowed = False
+        if not allowed and plan is not None:
+            plan.add(account)
+        return allowed
+
+    async def poll_account(self, account, plan=None, deadline=None,
+                           stopper=None):
+        """Опросить API для аккаунта и отправить изменившийся статус.
+
+        Возвращает результат admit(), если аккаунт отложен.
+        """
+        async with self.semaphore:
+            allowed = self.admit(account, plan, deadline, stopper)
+            if not allowed:
+                return allowed
+            with accounts.activate(account):
+                error = None
+                try:
+                    response = await self.get_api_answer(account.cursor)
+                    messages = self.handle_response(account, response)
+                except Exception as poll_error:
+                    error = poll_error
+                    messages = self.handle_error(account, error)
+                for text, updated in messages:
+                    self.send(account.name, account.chat_id, text, updated)
+        if plan is not None:
+            plan.report(account, error is None and bool(messages), error)
+        return True
+
+    async def run_cycle(self, registry, plan=None, deadline=None,
+                        stopper=None):
+        """Опросить аккаунты конкурентно в пределах бюджета цикла."""
+        if self.semaphore is None:
+            self.semaphore = asyncio.Semaphore(self.concurrency)
+        polled = await asyncio.gather(*(
+            self.poll_account(account, plan, deadline, stopper)
+            for account in registry))
+        stopped = polled.count(None)
+        if stopped:
+            logging.warning('Остановка, отложено аккаунтов: %d', stopped)
+        postponed = polled.count(False)
+        if postponed:
+            self.stats['cycle_overruns'] += 1
+            logging.warning(
+                'Бюджет цикла исчерпан, отложено аккаунтов: %d', postponed)
+
+    async def run(self, plan, budget, after_cycle=None, stopper=None):
+        """Опрашивать аккаунты по расписанию.
+
+        stopper (lifecycle.GracefulExit) завершает цикл по сигналу
+        остановки и прерывает паузу между циклами.
+        """
+        try:
+            while stopper is None or not stopper.requested:
+                if self.health is not None:
+                    self.health.wake(budget)
+                profiled = self.profiler is not None and self.profiler.enabled
+                if profiled:
+                    self.profiler.cycle_started()
+                deadline = scheduler.Deadline(budget)
+                await self.run_cycle(plan.due(), plan, deadline, stopper)
+                if after_cycle is not None:
+                    after_cycle(deadline)
+                if profiled:
+                    self.profiler.cycle_finished()
+                delay = plan.delay()
+                if self.health is not None:
+                    self.health.sleep(delay)
+                if stopper is None:
+                    await asyncio.sleep(delay)
+                    continue
+                with stopper.interruptible():
+                    await asyncio.sleep(delay)
+        finally:
+            self.executor.shutdown(wait=False)
@@ -0,0 +1,198 @@
+"""Нагрузочный прогон бота на локальных заглушках Практикума и Telegram.
+
+Запускает main() с N аккаунтами против заглушек из stubs.py и печатает
+опросы в секунду, сообщения в секунду, p50/p99 задержки уведомлений
+и пиковый RSS. Сеть не нужна:
+
+    python bench.py --accounts 200 --duration 10 --latency 0.02
+
+С --footprint вместо прогона измеряется память состояния аккаунтов
+вместе с хранилищем состояния SQLite:
+
+    python bench.py --accounts 100000 --footprint
+"""
+import argparse
+import functools
+import json
+import logging
+import os
+import resource
+import signal
+import tempfile
+import threading
+import time
+import tracemalloc
+
+import telegram
+
+import accounts
+import homework
+import latency
+import state
+import stubs
+
+
+def parse_args(argv=None):
+    """Разобрать параметры прогона."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--accounts', type=int, default=100)
+    parser.add_argument('--duration', type=float, default=10,
+                        help='длительность прогона, с')
+    parser.add_argument('--engine', choices=('sync', 'asyncio'),
+                        default='sync')
+    parser.add_argument('--period', type=int, default=0,
+                        help='период опроса аккаунта, с')
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help='задержка ответа Практикума, с')
+    parser.add_argument('--error-rate', type=float, default=0.0,
+                        help='доля ответов 500')
+    parser.add_argument('--homeworks', type=int, default=3,
+                        help='работ у каждого аккаунта')
+    parser.add_argument('--padding', type=int, default=0,
+                        help='длина комментария к каждой работе, байт')
+    parser.add_argument('--change-rate', type=float, default=0.1,
+                        help='вероятность смены статуса при опросе')
+    parser.add_argument('--telegram-latency', type=float, default=0.0)
+    parser.add_argument('--telegram-rate', type=float, default=1000,
+                        help='лимит сообщений в секунду всего')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--json', action='store_true',
+                        help='вывести результат одной строкой JSON')
+    parser.add_argument('--footprint', action='store_true',
+                        help='измерить байты на аккаунт вместо прогона')
+    return parser.parse_args(argv)
+
+
+def write_accounts(directory, count):
+    """Записать реестр из count аккаунтов и вернуть путь к нему."""
+    path = os.path.join(directory, 'accounts.json')
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump([{'name': f'student{index:05d}',
+                    'token': f'token-{index:05d}',
+                    'chat_id': str(100000 + index)}
+                   for index in range(count)], file)
+    return path
+
+
+def configure(options, directory, practicum, bot):
+    """Направить бота на заглушки и настроить его под прогон."""
+    homework.ACCOUNTS_PATH = write_accounts(directory, options.accounts)
+    homework.TELEGRAM_TOKEN = '1234:bench'
+    homework.ENDPOINT = practicum.url + '/api/user_api/homework_statuses/'
+    homework.STATE_PATH = os.path.join(directory, 'state.sqlite3')
+    homework.OUTBOX_PATH = os.path.join(directory, 'outbox.sqlite3')
+    homework.ENGINE = options.engine
+    homework.SENDER_THREAD = True
+    homework.RETRY_PERIOD = homework.REVIEW_PERIOD = options.period
+    homework.IDLE_PERIOD = max(options.period, 1)
+    homework.TELEGRAM_RATE = options.telegram_rate
+    homework.TELEGRAM_CHAT_RATE = options.telegram_rate
+    homework.CYCLE_BUDGET = max(options.duration, 1)
+    homework.METRICS_PORT = 0
+    telegram.Bot = functools.partial(telegram.Bot, base_url=bot.base_url)
+
+
+def account_footprint(count, homeworks=3, store_path=''):
+    """Память на аккаунт: запись реестра, состояние опроса и расписание.
+
+    Строит count аккаунтов с курсором, homeworks запомненными статусами,
+    местом в расписании и задержкой уведомления в LatencyTracker,
+    сохраняет состояние в хранилище store_path (state.open_store)
+    и считает выделенное по tracemalloc. Очередь отправки не учитывается:
+    она растёт с числом недоставленных сообщений, а не аккаунтов.
+    Возвращает байты на аккаунт: всего и отдельно без записи реестра.
+    """
+    started = not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        registry = [
+            accounts.Account(f'student{index:06d}', f'token-{index:06d}',
+                             str(100000 + index))
+            for index in range(count)]
+        loaded = tracemalloc.get_traced_memory()[0]
+        store = state.open_store(store_path)
+        tracker = latency.LatencyTracker()
+        plan = homework.create_scheduler(registry, clock=lambda: 0.0)
+        for index, account in enumerate(plan.due()):
+            account.cursor = 1700000000 + index
+            for number in range(homeworks):
+                account.remember(
+                    str(index * homeworks + number),
+                    homework.STATUS_CODES['approved'])
+            tracker.record(account.name, 1.0)
+            plan.report(account)
+        homework.save_state(store, registry)
+        total = tracemalloc.get_traced_memory()[0]
+        store.close()
+    finally:
+        if started:
+            tracemalloc.stop()
+    return {
+        'accounts': count,
+        'homeworks': homeworks,
+        'bytes_per_account': round((total - before) / count, 1),
+        'state_bytes': round((total - loaded) / count, 1),
+    }
+
+
+def run(options):
+    """Прогнать main() на заглушках и вернуть результаты."""
+    practicum = stubs.PracticumStub(
+        latency=options.latency, error_rate=options.error_rate,
+        homeworks=options.homeworks, change_rate=options.change_rate,
+        padding=options.padding, seed=options.seed).start()
+    bot = stubs.TelegramStub(latency=options.telegram_latency).start()
+    original_bot = telegram.Bot
+    timer = threading.Timer(
+        options.duration, os.kill, (os.getpid(), signal.SIGTERM))
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            configure(options, directory, practicum, bot)
+            started = time.monotonic()
+            timer.start()
+            homework.main()
+            elapsed = time.monotonic() - started
+    finally:
+        timer.cancel()
+        telegram.Bot = original_bot
+        practicum.stop()
+        bot.stop()
+    quantiles = homework.LATENCY.quantiles()
+    return {
+        'accounts': options.accounts,
+        'engine': options.engine,
+        'seconds': round(elapsed, 3),
+        'polls': practicum.requests,
+        'api_errors': practicum.errors,
+        'status_changes': practicum.changes,
+        'messages': len(bot.messages),
+        'polls_per_second': round(practicum.requests / elapsed, 1),
+        'messages_per_second': round(len(bot.messages) / elapsed, 1),
+        'notify_p50_seconds': quantiles[0.5],
+        'notify_p99_seconds': quantiles[0.99],
+        'max_rss_kib': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    }
+
+
+def main(argv=None):
+    """Точка входа нагрузочного прогона."""
+    options = parse_args(argv)
+    logging.basicConfig(level=logging.WARNING)
+    if options.footprint:
+        with tempfile.TemporaryDirectory() as directory:
+            result = account_footprint(
+                options.accounts, options.homeworks,
+                os.path.join(directory, 'state.sqlite3'))
+    else:
+        result = run(options)
+    if options.json:
+        print(json.dumps(result))
+        return
+    for key, value in result.items():
+        print(f'{key:>22}: {value}')
+
+
+if __name__ == '__main__':
+    main()
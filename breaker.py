@@ -0,0 +1,81 @@
+import logging
+import threading
+import time
+from collections import Counter, deque
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitBreaker:
+    """Автомат защиты для API, общего для всех аккаунтов.
+
+    Размыкается, когда доля неудачных запросов среди последних window
+    достигает failure_rate. Через open_timeout секунд пропускает один
+    пробный запрос: успех замыкает цепь, неудача снова её размыкает.
+    """
+
+    def __init__(self, name, failure_rate=0.5, window=20, min_calls=10,
+                 open_timeout=60, clock=time.monotonic):
+        """Создать закрытый предохранитель с окном последних вызовов."""
+        self.name = name
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.open_timeout = open_timeout
+        self.clock = clock
+        self.results = deque(maxlen=window)
+        self.state = CLOSED
+        self.open_until = 0
+        self.probing = False
+        self.transitions = Counter()
+        self.lock = threading.Lock()
+
+    def _switch(self, state):
+        """Перевести автомат в новое состояние."""
+        logging.warning('%s: %s -> %s', self.name, self.state, state)
+        self.state = state
+        self.transitions[state] += 1
+        if state == OPEN:
+            self.open_until = self.clock() + self.open_timeout
+        self.results.clear()
+        self.probing = False
+
+    def retry_after(self):
+        """Секунды до пробного запроса, пока цепь разомкнута."""
+        if self.state == CLOSED:
+            return 0
+        return max(self.open_until - self.clock(), 0)
+
+    def allow(self):
+        """Можно ли выполнить запрос сейчас."""
+        with self.lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and self.retry_after() <= 0:
+                self._switch(HALF_OPEN)
+            if self.state == HALF_OPEN and not self.probing:
+                self.probing = True
+                return True
+            return False
+
+    def hold(self, seconds):
+        """Разомкнуть цепь ровно на seconds секунд (Retry-After сервера)."""
+        with self.lock:
+            if self.state != OPEN:
+                self._switch(OPEN)
+            self.open_until = self.clock() + seconds
+
+    def record(self, success):
+        """Учесть результат запроса."""
+        with self.lock:
+            if self.state == HALF_OPEN:
+                self._switch(CLOSED if success else OPEN)
+                return
+            if self.state == OPEN:
+                return
+            self.results.append(success)
+            failures = self.results.count(False)
+            if (len(self.results) >= self.min_calls
+                    and failures >= self.failure_rate * len(self.results)):
+                self._switch(OPEN)
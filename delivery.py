@@ -0,0 +1,364 @@
+import heapq
+import itertools
+import logging
+import sqlite3
+import threading
+import time
+from collections import deque
+
+import exceptions
+
+MESSAGE_LIMIT = 4096
+DIGEST_SEPARATOR = '\n\n'
+
+
+class OutboxMessage:
+    """Сообщение в очереди отправки."""
+
+    __slots__ = ('id', 'account', 'chat_id', 'text', 'created', 'updated',
+                 'attempts', 'parts')
+
+    def __init__(self, id, account, chat_id, text, created, updated=None,
+                 attempts=0, parts=1):
+        """Создать сообщение очереди отправки."""
+        self.id = id
+        self.account = account
+        self.chat_id = chat_id
+        self.text = text
+        self.created = created
+        self.updated = updated
+        self.attempts = attempts
+        self.parts = parts
+
+
+def split_text(text, limit=MESSAGE_LIMIT):
+    """Разбить текст на части не длиннее limit, по возможности по строкам."""
+    chunks = []
+    current = ''
+    for line in text.split('\n'):
+        while len(line) > limit:
+            if current:
+                chunks.append(current)
+                current = ''
+            chunks.append(line[:limit])
+            line = line[limit:]
+        if current and len(current) + 1 + len(line) > limit:
+            chunks.append(current)
+            current = line
+        else:
+            current = f'{current}\n{line}' if current else line
+    if current or not chunks:
+        chunks.append(current)
+    return chunks
+
+
+class Outbox:
+    """Очередь сообщений в Telegram, сохраняемая в SQLite.
+
+    Сообщения одного чата отправляются строго по порядку: пока первое
+    сообщение чата не доставлено, следующие ждут. После неудачной попытки
+    чат откладывается с экспоненциально растущей паузой, а после RetryAfter —
+    ровно на указанное Telegram время. Сообщения, которые Telegram отклонил
+    окончательно (бот заблокирован, чат не найден), удаляются из очереди.
+    Если задан limiter, сообщения берутся из очереди не чаще, чем он
+    разрешает.
+
+    Накопившиеся сообщения чата склеиваются в одну сводку не длиннее
+    max_length; первое сообщение чата ждёт попутчиков до window секунд.
+    Слишком длинные сообщения разбиваются на части при постановке в очередь.
+    Для каждого доставленного сообщения вызывается on_delivered. Без пути
+    очередь хранится только в памяти.
+    """
+
+    def __init__(self, path='', backoff_base=5, backoff_max=600,
+                 limiter=None, coalesce=True, window=0,
+                 max_length=MESSAGE_LIMIT, on_delivered=None,
+                 clock=time.monotonic, wall_clock=time.time):
+        """Создать очередь; с path она хранится в SQLite."""
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.limiter = limiter
+        self.coalesce = coalesce
+        self.window = window
+        self.max_length = max_length
+        self.on_delivered = on_delivered
+        self.clock = clock
+        self.wall_clock = wall_clock
+        self.blocked_until = 0
+        self.lock = threading.Condition()
+        self.queues = {}
+        self.ready = deque()
+        self.delayed = []
+        self.unsaved = {}
+        self.acked = []
+        self.size = 0
+        self.next_id = 1
+        self.connection = None
+        if path:
+            self._open(path)
+
+    def _open(self, path):
+        """Открыть базу очереди и загрузить недоставленные сообщения."""
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        with self.connection:
+            self.connection.execute(
+                'CREATE TABLE IF NOT EXISTS outbox ('
+                'id INTEGER PRIMARY KEY, account TEXT NOT NULL, '
+                'chat_id TEXT NOT NULL, text TEXT NOT NULL, '
+                'created REAL NOT NULL, updated REAL)')
+            columns = {row[1] for row in self.connection.execute(
+                'PRAGMA table_info(outbox)')}
+            if 'updated' not in columns:
+                self.connection.execute(
+                    'ALTER TABLE outbox ADD COLUMN updated REAL')
+        for row in self.connection.execute(
+                'SELECT id, account, chat_id, text, created, updated '
+                'FROM outbox ORDER BY id'):
+            self._append(OutboxMessage(*row))
+            self.next_id = row[0] + 1
+        if self.size:
+            logging.info('В очереди отправки %d сообщений', self.size)
+
+    def __len__(self):
+        """Число сообщений, ожидающих отправки."""
+        return self.size
+
+    def _append(self, message):
+        """Добавить сообщение в очередь его чата."""
+        queue = self.queues.get(message.chat_id)
+        if queue is None:
+            queue = self.queues[message.chat_id] = deque()
+            self.ready.append(message.chat_id)
+        queue.append(message)
+        self.size += 1
+
+    def put(self, account, chat_id, text, updated=None):
+        """Поставить сообщение в очередь отправки.
+
+        updated — время события, о котором сообщение, для подсчёта задержки
+        доставки. Возвращает последнюю часть, если сообщение пришлось
+        разбить.
+        """
+        with self.lock:
+            created = self.wall_clock()
+            for chunk in split_text(text, self.max_length):
+                message = OutboxMessage(
+                    self.next_id, account, chat_id, chunk, created, updated)
+                self.next_id += 1
+                self._append(message)
+                self.unsaved[message.id] = message
+            self.lock.notify()
+        return message
+
+    def _digest(self, queue):
+        """Склеить первые сообщения чата в одну сводку."""
+        head = queue[0]
+        if not self.coalesce or len(queue) == 1:
+            return head
+        texts = [head.text]
+        length = len(head.text)
+        for message in itertools.islice(queue, 1, None):
+            length += len(DIGEST_SEPARATOR) + len(message.text)
+            if length > self.max_length or message.account != head.account:
+                break
+            texts.append(message.text)
+        if len(texts) == 1:
+            return head
+        logging.debug('Чат %s: %d сообщений в сводке', head.chat_id,
+                      len(texts))
+        return OutboxMessage(
+            head.id, head.account, head.chat_id, DIGEST_SEPARATOR.join(texts),
+            head.created, head.updated, head.attempts, len(texts))
+
+    def _take(self):
+        """Взять первое сообщение готового к отправке чата или None."""
+        now = self.clock()
+        while self.delayed and self.delayed[0][0] <= now:
+            self.ready.append(heapq.heappop(self.delayed)[1])
+        limiter = self.limiter
+        while self.ready:
+            if limiter is not None:
+                wait = limiter.global_wait()
+                if wait > 0:
+                    self.blocked_until = now + wait
+                    return None
+            chat_id = self.ready.popleft()
+            queue = self.queues[chat_id]
+            wait = 0
+            if self.window and queue[0].attempts == 0:
+                wait = queue[0].created + self.window - self.wall_clock()
+            if limiter is not None:
+                wait = max(wait, limiter.chat_wait(chat_id))
+            if wait > 0:
+                heapq.heappush(self.delayed, (now + wait, chat_id))
+                continue
+            if limiter is not None:
+                limiter.consume(chat_id)
+            return self._digest(queue)
+        return None
+
+    def take(self):
+        """Взять сообщение для отправки без ожидания."""
+        with self.lock:
+            return self._take()
+
+    def wait(self, timeout, stopped=None):
+        """Дождаться сообщения для отправки не дольше timeout секунд.
+
+        Ожидание прерывается, если установлено событие stopped.
+        """
+        deadline = self.clock() + timeout
+        with self.lock:
+            while True:
+                message = self._take()
+                if message is not None:
+                    return message
+                remaining = deadline - self.clock()
+                if remaining <= 0 or stopped is not None and stopped.is_set():
+                    return None
+                if self.delayed:
+                    remaining = min(
+                        remaining, self.delayed[0][0] - self.clock())
+                if self.ready and self.blocked_until:
+                    remaining = min(
+                        remaining, self.blocked_until - self.clock())
+                self.lock.wait(max(remaining, 0))
+
+    def complete(self, message, delivered, retry_after=None):
+        """Отметить результат отправки сообщения, взятого из очереди."""
+        with self.lock:
+            chat_id = message.chat_id
+            queue = self.queues[chat_id]
+            if not delivered:
+                queue[0].attempts += 1
+                if retry_after is not None:
+                    delay = retry_after
+                    if self.limiter is not None:
+                        self.limiter.block_chat(chat_id, retry_after)
+                else:
+                    delay = min(
+                        self.backoff_base * 2 ** (queue[0].attempts - 1),
+                        self.backoff_max)
+                heapq.heappush(self.delayed, (self.clock() + delay, chat_id))
+                return
+            delivered_parts = self._remove(message)
+        if self.on_delivered is not None:
+            for sent in delivered_parts:
+                self.on_delivered(sent)
+
+    def discard(self, message):
+        """Удалить из очереди сообщение, которое не будет доставлено."""
+        with self.lock:
+            self._remove(message)
+
+    def _remove(self, message):
+        """Убрать части сообщения из очереди чата; вызывается под lock."""
+        queue = self.queues[message.chat_id]
+        removed = []
+        for _ in range(message.parts):
+            sent = queue.popleft()
+            removed.append(sent)
+            self.size -= 1
+            if self.unsaved.pop(sent.id, None) is None:
+                self.acked.append(sent.id)
+        if queue:
+            self.ready.append(message.chat_id)
+        else:
+            del self.queues[message.chat_id]
+        return removed
+
+    def send(self, message, deliver):
+        """Отправить взятое из очереди сообщение и отметить результат."""
+        try:
+            delivered = deliver(message)
+        except exceptions.FloodControlError as error:
+            logging.warning('Чат %s: %s', message.chat_id, error)
+            self.complete(message, False, error.retry_after)
+            return False
+        except exceptions.UndeliverableError as error:
+            logging.error('%s, сообщение удалено из очереди', error)
+            self.discard(message)
+            return False
+        except Exception as error:
+            logging.error('Чат %s: сбой отправки: %s', message.chat_id, error)
+            self.complete(message, False)
+            return False
+        self.complete(message, delivered)
+        return bool(delivered)
+
+    def drain(self, deliver, deadline=None):
+        """Отправить все готовые сообщения в текущем потоке.
+
+        С deadline отправка прекращается, когда бюджет исчерпан.
+        """
+        sent = 0
+        while deadline is None or deadline.remaining() > 0:
+            message = self.take()
+            if message is None:
+                break
+            sent += self.send(message, deliver)
+        self.flush()
+        return sent
+
+    def flush(self):
+        """Записать новые и удалить доставленные сообщения одним пакетом."""
+        with self.lock:
+            unsaved = list(self.unsaved.values())
+            acked = self.acked
+            self.unsaved = {}
+            self.acked = []
+        if self.connection is None or not (unsaved or acked):
+            return
+        with self.lock, self.connection:
+            self.connection.executemany(
+                'INSERT OR REPLACE INTO outbox '
+                '(id, account, chat_id, text, created, updated) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                [(message.id, message.account, message.chat_id,
+                  message.text, message.created, message.updated)
+                 for message in unsaved])
+            self.connection.executemany(
+                'DELETE FROM outbox WHERE id = ?', [(id,) for id in acked])
+
+    def close(self):
+        """Сохранить очередь и закрыть базу."""
+        self.flush()
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+
+class SenderWorker(threading.Thread):
+    """Фоновый поток, отправляющий сообщения из очереди."""
+
+    def __init__(self, outbox, deliver, poll_interval=1.0):
+        """Подготовить фоновый поток отправки сообщений."""
+        super().__init__(name='telegram-sender', daemon=True)
+        self.outbox = outbox
+        self.deliver = deliver
+        self.poll_interval = poll_interval
+        self.stopped = threading.Event()
+
+    def run(self):
+        """Отправлять сообщения, пока поток не остановлен."""
+        while not self.stopped.is_set():
+            message = self.outbox.wait(self.poll_interval, self.stopped)
+            if message is None:
+                try:
+                    self.outbox.flush()
+                except sqlite3.Error as error:
+                    logging.error(
+                        'Не удалось сохранить очередь отправки: %s', error)
+                continue
+            try:
+                self.outbox.send(message, self.deliver)
+            except Exception as error:
+                logging.error('Сбой отправителя сообщений: %s', error)
+
+    def stop(self, timeout=None):
+        """Остановить поток и дождаться его завершения."""
+        self.stopped.set()
+        with self.outbox.lock:
+            self.outbox.lock.notify_all()
+        self.join(timeout)
@@ -14,3 +14,58 @@ class EmptyAnswerAPI(Exception):
     '''Обработка исключения при пустом ответе от API'''
 
     pass
+
+
+class AccountsConfigError(Exception):
+    '''Обработка исключения при ошибке в реестре аккаунтов'''
+
+    pass
+
+
+class FloodControlError(Exception):
+    '''Обработка исключения при превышении лимитов Telegram'''
+
+    def __init__(self, retry_after):
+        super().__init__(f'Превышен лимит Telegram, повтор через '
+                         f'{retry_after} с')
+        self.retry_after = retry_after
+
+
+class UndeliverableError(Exception):
+    '''Обработка исключения, когда Telegram окончательно отклонил сообщение'''
+
+    pass
+
+
+class DeadlineExceeded(Exception):
+    '''Обработка исключения при превышении бюджета времени цикла'''
+
+    pass
+
+
+class CircuitOpenError(Exception):
+    '''Обработка исключения, когда запросы к API приостановлены'''
+
+    def __init__(self, retry_after):
+        super().__init__(f'Запросы к API приостановлены на {retry_after:.0f} с')
+        self.retry_after = retry_after
+
+
+class ApiThrottledError(OrigHTTPError):
+    '''Обработка исключения, когда API просит повторить запрос позже'''
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class ReplayExhausted(Exception):
+    '''Обработка исключения, когда записанные ответы API закончились'''
+
+    pass
+
+
+class ShutdownRequested(BaseException):
+    '''Прерывание паузы основного цикла сигналом остановки'''
+
+    pass
@@ -0,0 +1,61 @@
+import threading
+import time
+
+
+class Monitor:
+    """Признаки жизни основного цикла.
+
+    Цикл отмечает начало работы (wake) и запланированную паузу (sleep).
+    Если к ожидаемому моменту цикл не проснулся и не закончил работу с
+    запасом stall_after секунд, он считается зависшим.
+    """
+
+    def __init__(self, stall_after=300, depth=None, clock=time.monotonic,
+                 wall_clock=time.time):
+        """Создать монитор; цикл завис, если молчит дольше stall_after."""
+        self.stall_after = stall_after
+        self.depth = depth
+        self.clock = clock
+        self.wall_clock = wall_clock
+        self.expected = None
+        self.planned = None
+        self.lag = 0.0
+        self.last_poll = None
+        self.lock = threading.Lock()
+
+    def wake(self, budget):
+        """Отметить начало цикла, которому отведено budget секунд."""
+        with self.lock:
+            now = self.clock()
+            if self.planned is not None:
+                self.lag = max(now - self.planned, 0.0)
+                self.planned = None
+            self.expected = now + budget
+
+    def sleep(self, delay):
+        """Отметить паузу до следующего цикла."""
+        with self.lock:
+            self.planned = self.expected = self.clock() + delay
+
+    def polled(self):
+        """Отметить успешный опрос API."""
+        self.last_poll = self.wall_clock()
+
+    def stalled(self):
+        """Сколько секунд цикл не подаёт признаков жизни сверх ожидаемого."""
+        with self.lock:
+            if self.expected is None:
+                return 0.0
+            return max(self.clock() - self.expected, 0.0)
+
+    def report(self):
+        """Признак здоровья и сведения о цикле для эндпоинта /health."""
+        stalled = self.stalled()
+        healthy = stalled <= self.stall_after
+        return healthy, {
+            'status': 'ok' if healthy else 'stalled',
+            'last_poll': self.last_poll,
+            'loop_lag': self.lag,
+            'stalled_for': stalled,
+            'outbox_depth': self.depth() if self.depth is not None else None,
+        }
@@ -1,7 +1,14 @@
+import asyncio
+import datetime
+import email.utils
+import functools
 import logging
+import math
 import os
+import sqlite3
 import sys
 import time
+from collections import Counter, namedtuple
 from http import HTTPStatus
 
 import telegram
@@ -9,17 +16,79 @@ import requests
 from requests.exceptions import RequestException
 from dotenv import load_dotenv
 
+import accounts
+import aio
+import breaker
+import delivery
 import exceptions
+import health
+import latency
+import lifecycle
+import logs
+import profiling
+import metrics
+import ratelimit
+import scheduler
+import state
+import transport
 
 load_dotenv()
 
 PRACTICUM_TOKEN = os.getenv('PR_TOKEN')
 TELEGRAM_TOKEN = os.getenv('TEL_TOKEN')
 TELEGRAM_CHAT_ID = os.getenv('TEL_ID')
+ACCOUNTS_PATH = os.getenv('BOT_ACCOUNTS')
+ENGINE = os.getenv('BOT_ENGINE', 'sync')
+CONCURRENCY = int(os.getenv('BOT_CONCURRENCY', 64))
+POOL_SIZE = int(os.getenv('PR_POOL_SIZE', 10))
+POOL_RETRIES = int(os.getenv('PR_RETRIES', 2))
+STATE_PATH = os.getenv('BOT_STATE_PATH', 'bot_state.sqlite3')
+OUTBOX_PATH = os.getenv('BOT_OUTBOX_PATH', 'bot_outbox.sqlite3')
+SENDER_THREAD = os.getenv('BOT_SENDER_THREAD', '1') == '1'
+TELEGRAM_RATE = float(os.getenv('TEL_RATE', 30))
+TELEGRAM_CHAT_RATE = float(os.getenv('TEL_CHAT_RATE', 1))
+DIGEST_WINDOW = float(os.getenv('BOT_DIGEST_WINDOW', 0))
+CONNECT_TIMEOUT = float(os.getenv('PR_CONNECT_TIMEOUT', 3.05))
+READ_TIMEOUT = float(os.getenv('PR_READ_TIMEOUT', 10))
+SEND_TIMEOUT = float(os.getenv('TEL_TIMEOUT', 10))
+CYCLE_BUDGET = float(os.getenv('BOT_CYCLE_BUDGET', 300))
+BREAKER_FAILURE_RATE = float(os.getenv('PR_BREAKER_FAILURE_RATE', 0.5))
+BREAKER_TIMEOUT = float(os.getenv('PR_BREAKER_TIMEOUT', 60))
+METRICS_PORT = int(os.getenv('BOT_METRICS_PORT', 0))
+STALL_AFTER = float(os.getenv('BOT_STALL_AFTER', 300))
+SHUTDOWN_TIMEOUT = float(os.getenv('BOT_SHUTDOWN_TIMEOUT', 10))
+RECORD_PATH = os.getenv('BOT_RECORD_PATH')
+REPLAY_PATH = os.getenv('BOT_REPLAY_PATH')
+REPLAY_SPEED = float(os.getenv('BOT_REPLAY_SPEED', 1))
+PROFILE = os.getenv('BOT_PROFILE')
+PROFILE_DIR = os.getenv('BOT_PROFILE_DIR', 'profiles')
+PROFILE_CYCLES = int(os.getenv('BOT_PROFILE_CYCLES', 10))
+REVIEW_PERIOD = int(os.getenv('BOT_REVIEW_PERIOD', 120))
+IDLE_PERIOD = int(os.getenv('BOT_IDLE_PERIOD', 1800))
+IDLE_AFTER = int(os.getenv('BOT_IDLE_AFTER', 36))
+BACKOFF_MAX = int(os.getenv('BOT_BACKOFF_MAX', 3600))
+LOG_PATH = os.getenv('BOT_LOG_PATH', 'program.log')
+LOG_LEVEL = os.getenv('BOT_LOG_LEVEL', 'INFO')
+LOG_MAX_BYTES = int(os.getenv('BOT_LOG_MAX_BYTES', 10 * 2 ** 20))
+LOG_BACKUPS = int(os.getenv('BOT_LOG_BACKUPS', 5))
+LOG_FORMAT = os.getenv('BOT_LOG_FORMAT', 'json')
+LOG_SAMPLE = int(os.getenv('BOT_LOG_SAMPLE', 10))
+LOG_RATE = int(os.getenv('BOT_LOG_RATE', 60))
 
 RETRY_PERIOD = 600
 ENDPOINT = 'https://practicum.yandex.ru/api/user_api/homework_statuses/'
 HEADERS = {'Authorization': f'OAuth {PRACTICUM_TOKEN}'}
+if ENGINE == 'asyncio' and POOL_SIZE > 0:
+    POOL_SIZE = max(POOL_SIZE, CONCURRENCY)
+SESSION = transport.create_session(POOL_SIZE, POOL_RETRIES)
+if REPLAY_PATH:
+    SESSION = transport.ReplayTransport(REPLAY_PATH, speed=REPLAY_SPEED)
+elif RECORD_PATH:
+    SESSION = transport.RecordingTransport(SESSION or requests, RECORD_PATH)
+BREAKER = breaker.CircuitBreaker(
+    ENDPOINT, failure_rate=BREAKER_FAILURE_RATE, open_timeout=BREAKER_TIMEOUT)
+HEALTH = health.Monitor(STALL_AFTER)
+PROFILER = profiling.Profiler(PROFILE_DIR, PROFILE_CYCLES, PROFILE)
 
 
 HOMEWORK_VERDICTS = {
@@ -27,40 +96,209 @@ HOMEWORK_VERDICTS = {
     'reviewing': 'Работа взята на проверку ревьюером.',
     'rejected': 'Работа проверена: у ревьюера есть замечания.'
 }
+# один объект строки на статус для индексов всех аккаунтов
+STATUS_CODES = {status: status for status in HOMEWORK_VERDICTS}
+MESSAGE_PREFIX = 'Изменился статус проверки работы "'
+MESSAGE_SUFFIXES = {
+    status: f'". {verdict}' for status, verdict in HOMEWORK_VERDICTS.items()
+}
+
+ParseError = namedtuple('ParseError', ('index', 'homework', 'reason'))
+Notification = namedtuple('Notification', ('text', 'updated'))
+
+SAMPLED_EVENTS = (
+    'Начало запроса: url = %s, params = %s',
+    'Работ в ответе: %d',
+    'Статус не поменялся',
+)
+
+STATS = Counter()
+
+STAGE_SECONDS = metrics.REGISTRY.histogram(
+    'homework_bot_stage_seconds', 'Длительность этапов обработки', ('stage',))
+ERRORS = metrics.REGISTRY.counter(
+    'homework_bot_errors_total', 'Исключения по классам', ('exception',))
+POLLS = metrics.REGISTRY.counter(
+    'homework_bot_polls_total', 'Опросы API', ('result',))
+MESSAGES_SENT = metrics.REGISTRY.counter(
+    'homework_bot_messages_sent_total', 'Сообщения, доставленные в Telegram')
+MESSAGES_DROPPED = metrics.REGISTRY.counter(
+    'homework_bot_messages_dropped_total',
+    'Сообщения, окончательно отклонённые Telegram')
+LATENCY = latency.LatencyTracker()
+NOTIFY_SECONDS = metrics.REGISTRY.histogram(
+    'homework_bot_notify_latency_seconds',
+    'Задержка от смены статуса до доставки уведомления',
+    buckets=(1, 5, 15, 30, 60, 120, 300, 600, 900, 1200, 1800, 3600, 7200))
+metrics.REGISTRY.gauge(
+    'homework_bot_notify_latency_quantile_seconds',
+    'Квантили задержки уведомлений по всем аккаунтам',
+    lambda: {(str(q),): value for q, value in LATENCY.quantiles().items()
+             if value is not None}, ('quantile',))
+metrics.REGISTRY.computed_counter(
+    'homework_bot_events_total', 'Служебные события цикла',
+    lambda: {(event,): count for event, count in STATS.items()}, ('event',))
+metrics.REGISTRY.computed_counter(
+    'homework_bot_api_bytes_received_total', 'Байт получено от API',
+    lambda: SESSION.stats()['bytes'] if SESSION is not None else 0)
+metrics.REGISTRY.computed_counter(
+    'homework_bot_api_connections_total', 'Соединения с API',
+    lambda: ({(kind,): SESSION.stats()[kind] for kind in ('opened', 'reused')}
+             if SESSION is not None else {}), ('kind',))
+metrics.REGISTRY.gauge(
+    'homework_bot_last_poll_timestamp_seconds', 'Время последнего успешного '
+    'опроса API', lambda: HEALTH.last_poll or 0)
+metrics.REGISTRY.gauge(
+    'homework_bot_loop_lag_seconds', 'Опоздание пробуждения цикла',
+    lambda: HEALTH.lag)
+metrics.REGISTRY.gauge(
+    'homework_bot_breaker_open', 'Запросы к API приостановлены',
+    lambda: int(BREAKER.state != breaker.CLOSED))
+metrics.REGISTRY.computed_counter(
+    'homework_bot_breaker_transitions_total', 'Переключения автомата защиты',
+    lambda: {(state,): count
+             for state, count in BREAKER.transitions.items()}, ('state',))
 
 
 def check_tokens():
     """Проверка доступности токенов и ID."""
+    if ACCOUNTS_PATH:
+        return bool(TELEGRAM_TOKEN)
     return all([TELEGRAM_TOKEN, PRACTICUM_TOKEN, TELEGRAM_CHAT_ID])
 
 
+def load_registry():
+    """Загрузить аккаунты из реестра или из переменных окружения."""
+    if ACCOUNTS_PATH:
+        return accounts.load_accounts(ACCOUNTS_PATH)
+    return [accounts.Account('default', PRACTICUM_TOKEN, TELEGRAM_CHAT_ID)]
+
+
+@STAGE_SECONDS.time(stage='send_message')
 def send_message(bot, message):
     """Отправляет сообщение в чат."""
+    account = accounts.current_account.get()
+    chat_id = TELEGRAM_CHAT_ID if account is None else account.chat_id
     try:
-        logging.debug(f"Начало отправки сообщения: {message}")
-        bot.send_message(TELEGRAM_CHAT_ID, message)
-        logging.debug(f'Сообщение в чат {TELEGRAM_CHAT_ID}: {message}')
+        logging.debug('Начало отправки сообщения: %s', message)
+        bot.send_message(chat_id, message, timeout=SEND_TIMEOUT)
+        logging.debug('Сообщение в чат %s: %s', chat_id, message)
+    except telegram.error.RetryAfter as error:
+        ERRORS.inc(exception=exceptions.FloodControlError.__name__)
+        raise exceptions.FloodControlError(error.retry_after)
+    except (telegram.error.Unauthorized, telegram.error.BadRequest) as error:
+        ERRORS.inc(exception=type(error).__name__)
+        MESSAGES_DROPPED.inc()
+        raise exceptions.UndeliverableError(
+            f'Telegram отклонил сообщение в чат {chat_id}: {error}')
     except Exception as error:
-        logging.error(f'Ошибка отправки сообщения в Telegramm: {error}')
+        ERRORS.inc(exception=type(error).__name__)
+        logging.error('Ошибка отправки сообщения в Telegramm: %s', error)
+        return False
+    MESSAGES_SENT.inc()
+    return True
+
+
+def deliver_message(bot, registry, message):
+    """Отправить сообщение из очереди от имени его аккаунта."""
+    account = registry.get(message.account)
+    if account is None:
+        logging.warning(
+            'Сообщение для удалённого аккаунта %s пропущено', message.account)
+        return True
+    with accounts.activate(account):
+        return send_message(bot, message.text)
+
+
+def record_latency(message, now=None):
+    """Учесть задержку доставки уведомления о смене статуса."""
+    if message.updated is None:
+        return
+    now = time.time() if now is None else now
+    delay = max(now - message.updated, 0)
+    NOTIFY_SECONDS.observe(delay)
+    LATENCY.record(message.account, delay)
+
+
+def parse_updated(value):
+    """Время смены статуса из поля date_updated в секундах или None."""
+    if not isinstance(value, str):
+        return None
+    try:
+        moment = datetime.datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=datetime.timezone.utc)
+    return moment.timestamp()
+
+
+def parse_retry_after(value, now=None):
+    """Получить паузу в секундах из заголовка Retry-After или None.
+
+    Пауза ограничена BACKOFF_MAX, бесконечность и NaN отбрасываются.
+    """
+    if not value:
+        return None
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            moment = email.utils.parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        now = time.time() if now is None else now
+        seconds = moment.timestamp() - now
+    if not math.isfinite(seconds):
+        return None
+    return min(max(seconds, 0), BACKOFF_MAX)
 
 
+@STAGE_SECONDS.time(stage='get_api_answer')
 def get_api_answer(timestamp):
     """Получить статус домашней работы из обновления."""
-    params = {'url': ENDPOINT, 'headers': HEADERS,
-              'params': {'from_date': timestamp}}
+    account = accounts.current_account.get()
+    headers = HEADERS if account is None else account.headers
+    params = {'url': ENDPOINT, 'headers': headers,
+              'params': {'from_date': timestamp},
+              'timeout': (CONNECT_TIMEOUT, READ_TIMEOUT)}
+    if not BREAKER.allow():
+        raise exceptions.CircuitOpenError(BREAKER.retry_after())
     try:
-        logging.info(
-            'Начало запроса: url = {url}, headers = {headers},'
-            'params = {params}'.format(**params))
-        homework_statuses = requests.get(**params)
+        logging.info('Начало запроса: url = %s, params = %s',
+                     ENDPOINT, params['params'])
+        http = requests if SESSION is None else SESSION
+        homework_statuses = http.get(**params)
     except RequestException as error:
+        BREAKER.record(False)
         raise exceptions.OrigExceptError(f'Ошибка при запросе к API: {error}')
-    else:
-        if homework_statuses.status_code != HTTPStatus.OK:
-            raise exceptions.OrigHTTPError('Статус страницы не равен 200')
-        return homework_statuses.json()
+    BREAKER.record(
+        homework_statuses.status_code < HTTPStatus.INTERNAL_SERVER_ERROR)
+    try:
+        return read_api_answer(homework_statuses)
+    except exceptions.ApiThrottledError as error:
+        if error.retry_after is not None:
+            BREAKER.hold(error.retry_after)
+        raise
+
 
+def read_api_answer(homework_statuses):
+    """Разобрать HTTP-ответ API: тело при 200, иначе исключение."""
+    status = homework_statuses.status_code
+    if (status == HTTPStatus.TOO_MANY_REQUESTS
+            or status >= HTTPStatus.INTERNAL_SERVER_ERROR):
+        retry_after = parse_retry_after(
+            homework_statuses.headers.get('Retry-After'))
+        message = f'API ответило {int(status)}'
+        if retry_after is not None:
+            message += f', повтор через {retry_after:g} с'
+        raise exceptions.ApiThrottledError(message, retry_after)
+    if status != HTTPStatus.OK:
+        raise exceptions.OrigHTTPError('Статус страницы не равен 200')
+    return homework_statuses.json()
 
+
+@STAGE_SECONDS.time(stage='check_response')
 def check_response(response):
     """Проверить валидность ответа."""
     if not isinstance(response, dict):
@@ -74,6 +312,7 @@ def check_response(response):
     return homeworks
 
 
+@STAGE_SECONDS.time(stage='parse_status')
 def parse_status(homework):
     """Получить статус домашней работы."""
     if 'homework_name' not in homework:
@@ -84,8 +323,300 @@ def parse_status(homework):
     homework_status = homework['status']
     if homework_status not in HOMEWORK_VERDICTS:
         raise ValueError(f'Неизвестный статус работы: {homework_status}')
-    verdict = HOMEWORK_VERDICTS[homework_status]
-    return f'Изменился статус проверки работы "{homework_name}". {verdict}'
+    return MESSAGE_PREFIX + str(homework_name) + MESSAGE_SUFFIXES[
+        homework_status]
+
+
+@STAGE_SECONDS.time(stage='parse_status')
+def parse_statuses(homeworks):
+    """Получить сообщения о статусах списка работ за один проход.
+
+    Возвращает список сообщений той же длины, что и homeworks (None на
+    месте некорректной работы), и список ошибок ParseError.
+    """
+    messages = []
+    errors = []
+    suffixes = MESSAGE_SUFFIXES
+    for index, homework in enumerate(homeworks):
+        if not isinstance(homework, dict):
+            reason = 'Работа в ответе API не является словарём'
+        elif 'homework_name' not in homework:
+            reason = 'Отсутствует ключ "homework_name" в ответе API'
+        elif 'status' not in homework:
+            reason = 'Отсутствует ключ "status" в ответе API'
+        elif homework['status'] not in suffixes:
+            reason = f'Неизвестный статус работы: {homework["status"]}'
+        else:
+            messages.append(MESSAGE_PREFIX + str(homework['homework_name'])
+                            + suffixes[homework['status']])
+            continue
+        messages.append(None)
+        errors.append(ParseError(index, homework, reason))
+    return messages, errors
+
+
+def homework_key(homework):
+    """Ключ работы в индексе статусов: id или название."""
+    return str(homework.get('id', homework.get('homework_name')))
+
+
+def diff_homeworks(statuses, homeworks):
+    """Вернуть работы, статус которых отличается от индекса.
+
+    API отдаёт работы от новых к старым, поэтому изменения возвращаются
+    в хронологическом порядке, а повтор работы в ответе пропускается.
+    Элементы, не являющиеся словарём, возвращаются вторым списком
+    как ParseError.
+    """
+    changed = []
+    errors = []
+    seen = set()
+    for index, homework in enumerate(homeworks):
+        if not isinstance(homework, dict):
+            errors.append(ParseError(
+                index, homework, 'Работа в ответе API не является словарём'))
+            continue
+        key = homework_key(homework)
+        if key in seen:
+            continue
+        seen.add(key)
+        if statuses.get(key) != homework.get('status'):
+            changed.append((key, homework))
+    changed.reverse()
+    return changed, errors
+
+
+def index_history(account, changed):
+    """Молча занести в индекс всё, кроме самой новой работы.
+
+    При первом опросе аккаунта API отдаёт всю историю работ; о ней
+    не сообщаем, как и прежде уведомляя только о последней работе.
+    """
+    for key, homework in changed[:-1]:
+        status = homework.get('status')
+        if status in STATUS_CODES:
+            account.remember(key, STATUS_CODES[status])
+    return changed[-1:]
+
+
+def handle_response(account, response):
+    """Обработать ответ API и вернуть уведомления об изменениях.
+
+    Уведомление несёт время смены статуса из date_updated, чтобы
+    измерить задержку до его доставки. При первом опросе аккаунта
+    история работ заносится в индекс без уведомлений, а о последней
+    работе сообщается без времени смены: оно не отражает задержку бота.
+    """
+    new_homeworks = check_response(response)
+    POLLS.inc(result='ok')
+    HEALTH.polled()
+    logging.debug('Работ в ответе: %d', len(new_homeworks))
+    first_sync = not account.cursor and not account.statuses
+    changed, errors = diff_homeworks(account.statuses, new_homeworks)
+    if first_sync:
+        changed = index_history(account, changed)
+    parsed, parse_errors = parse_statuses(
+        [homework for _, homework in changed])
+    errors.extend(parse_errors)
+    messages = []
+    for (key, homework), message in zip(changed, parsed):
+        if message is not None:
+            account.remember(key, STATUS_CODES[homework['status']])
+            updated = None if first_sync else parse_updated(
+                homework.get('date_updated'))
+            messages.append(Notification(message, updated))
+    if not changed:
+        logging.debug('Статус не поменялся')
+    current_date = response.get('current_date')
+    if isinstance(current_date, int):
+        account.cursor = current_date
+    if errors:
+        messages.extend(report_error(account, ValueError(
+            '; '.join(error.reason for error in errors))))
+    else:
+        account.last_error = None
+    return messages
+
+
+def handle_error(account, error):
+    """Учесть неудачный опрос и вернуть уведомления о сбое."""
+    POLLS.inc(result='error')
+    return report_error(account, error)
+
+
+def report_error(account, error):
+    """Залогировать сбой и вернуть уведомления о нём.
+
+    Ограничение частоты запросов и сбои сервера API касаются бота, а не
+    студента, поэтому о них только пишется в лог и метрики.
+    """
+    ERRORS.inc(exception=type(error).__name__)
+    if isinstance(error, exceptions.ApiThrottledError):
+        logging.warning('API временно недоступно: %s', error)
+        return []
+    logging.error('Сбой в работе программы: %s', error)
+    if isinstance(error, (exceptions.EmptyAnswerAPI,
+                          exceptions.CircuitOpenError)):
+        return []
+    message = f'Сбой в работе программы: {error}'
+    if message == account.last_error:
+        return []
+    account.last_error = message
+    return [Notification(message, None)]
+
+
+def poll_account(outbox, account):
+    """Опросить API для одного аккаунта и поставить в очередь изменения.
+
+    Возвращает признак изменения статуса и исключение, если опрос не удался.
+    """
+    error = None
+    try:
+        messages = handle_response(account, get_api_answer(account.cursor))
+    except Exception as poll_error:
+        error = poll_error
+        messages = handle_error(account, error)
+    for text, updated in messages:
+        outbox.put(account.name, account.chat_id, text, updated)
+    return error is None and bool(messages), error
+
+
+def run_cycle(plan, outbox, deadline, stopper=None):
+    """Опросить аккаунты, время которых наступило, в пределах бюджета.
+
+    Аккаунты, до которых не дошла очередь, остаются в расписании и будут
+    опрошены в следующем цикле. После сигнала остановки (stopper —
+    lifecycle.GracefulExit) оставшиеся аккаунты тоже возвращаются
+    в расписание, чтобы бот успел выйти за отведённое время.
+    """
+    due = plan.due()
+    for index, account in enumerate(due):
+        if stopper is not None and stopper.requested:
+            logging.warning('Остановка, отложено аккаунтов: %d',
+                            len(due) - index)
+            for postponed in due[index:]:
+                plan.add(postponed)
+            return
+        try:
+            deadline.check('опрос API')
+        except exceptions.DeadlineExceeded as error:
+            STATS['cycle_overruns'] += 1
+            ERRORS.inc(exception=type(error).__name__)
+            logging.warning('%s, отложено аккаунтов: %d', error,
+                            len(due) - index)
+            for postponed in due[index:]:
+                plan.add(postponed)
+            return
+        with accounts.activate(account):
+            changed, error = poll_account(outbox, account)
+        plan.report(account, changed, error)
+
+
+def create_scheduler(registry, clock=time.monotonic, rng=None, **policy):
+    """Создать расписание опроса и поставить в него все аккаунты.
+
+    policy переопределяет параметры расписания из настроек.
+    """
+    settings = dict(
+        period=RETRY_PERIOD, review_period=REVIEW_PERIOD,
+        idle_period=IDLE_PERIOD, idle_after=IDLE_AFTER,
+        backoff_max=BACKOFF_MAX)
+    settings.update(policy)
+    plan = scheduler.Scheduler(clock=clock, rng=rng, **settings)
+    for account in registry:
+        plan.add(account)
+    return plan
+
+
+def load_state(store, registry):
+    """Восстановить курсоры и статусы аккаунтов из хранилища."""
+    for account in registry:
+        account.cursor = account.saved_cursor = store.get_cursor(
+            account.name)
+        account.statuses = {
+            key: STATUS_CODES.get(status, status)
+            for key, status in store.get_statuses(account.name).items()}
+
+
+def save_state(store, registry):
+    """Сохранить изменения курсоров и статусов одним пакетом."""
+    for account in registry:
+        if account.cursor != account.saved_cursor:
+            store.set_cursor(account.name, account.cursor)
+            account.saved_cursor = account.cursor
+        for key, status in account.saved():
+            store.set_status(account.name, key, status)
+    try:
+        store.flush()
+    except (OSError, sqlite3.Error) as error:
+        logging.error('Не удалось сохранить состояние: %s', error)
+
+
+def finish_cycle(store, registry, outbox, deliver, deadline):
+    """Сохранить очередь и состояние; без фонового потока — отправить."""
+    try:
+        outbox.flush()
+    except sqlite3.Error as error:
+        logging.error('Не удалось сохранить очередь отправки: %s', error)
+    save_state(store, registry)
+    if SENDER_THREAD:
+        return
+    try:
+        deadline.check('отправка сообщений')
+    except exceptions.DeadlineExceeded as error:
+        STATS['cycle_overruns'] += 1
+        ERRORS.inc(exception=type(error).__name__)
+        logging.warning('%s, сообщения отправятся в следующем цикле', error)
+        return
+    outbox.drain(deliver, deadline)
+
+
+def run_iteration(plan, store, registry, outbox, deliver,
+                  clock=time.monotonic, stopper=None):
+    """Один проход основного цикла; возвращает паузу до следующего."""
+    HEALTH.wake(CYCLE_BUDGET)
+    if PROFILER.enabled:
+        PROFILER.cycle_started()
+    deadline = scheduler.Deadline(CYCLE_BUDGET, clock)
+    run_cycle(plan, outbox, deadline, stopper)
+    finish_cycle(store, registry, outbox, deliver, deadline)
+    if PROFILER.enabled:
+        PROFILER.cycle_finished()
+    log_session_stats()
+    delay = plan.delay()
+    HEALTH.sleep(delay)
+    return delay
+
+
+def log_session_stats():
+    """Записать в отладочный лог статистику соединений с API."""
+    if SESSION is not None and logging.root.isEnabledFor(logging.DEBUG):
+        logging.debug(
+            'Соединения с API: %(opened)d открыто, '
+            '%(reused)d переиспользовано, получено %(bytes)d байт',
+            SESSION.stats())
+
+
+def shutdown(store, registry, outbox, deliver, worker):
+    """Остановить отправку, дослать очередь и сохранить состояние.
+
+    На всё отводится SHUTDOWN_TIMEOUT секунд; недосланные сообщения
+    остаются в сохранённой очереди.
+    """
+    deadline = scheduler.Deadline(SHUTDOWN_TIMEOUT)
+    if worker is not None:
+        worker.stop(deadline.remaining())
+    try:
+        outbox.drain(deliver, deadline)
+    except sqlite3.Error as error:
+        logging.error('Не удалось сохранить очередь отправки: %s', error)
+    save_state(store, registry)
+    outbox.close()
+    store.close()
+    if SESSION is not None:
+        SESSION.close()
+    logging.info('Бот остановлен, в очереди осталось %d сообщений',
+                 len(outbox))
 
 
 def main():
@@ -93,48 +624,68 @@ def main():
     if not check_tokens():
         logging.critical('Ошибка получения токенов')
         sys.exit()
+    try:
+        registry = load_registry()
+    except exceptions.AccountsConfigError as error:
+        logging.critical('Ошибка загрузки аккаунтов: %s', error)
+        sys.exit()
+    store = state.open_store(STATE_PATH)
+    load_state(store, registry)
+    plan = create_scheduler(registry)
+    outbox = delivery.Outbox(
+        OUTBOX_PATH, window=DIGEST_WINDOW,
+        limiter=ratelimit.SendLimiter(TELEGRAM_RATE, TELEGRAM_CHAT_RATE),
+        on_delivered=record_latency)
+    metrics.REGISTRY.gauge(
+        'homework_bot_outbox_depth', 'Сообщений в очереди отправки',
+        lambda: len(outbox))
+    HEALTH.depth = outbox.__len__
+    if METRICS_PORT:
+        metrics.serve(metrics.REGISTRY, METRICS_PORT, health=HEALTH)
     bot = telegram.Bot(token=TELEGRAM_TOKEN)
-    current_timestamp = 0
-    current_report = {}
-    prev_report = {}
-    while True:
-        try:
-            response = get_api_answer(current_timestamp)
-            current_timestamp = response.get('current_data', current_timestamp)
-            new_homeworks = check_response(response)
-            if new_homeworks:
-                homework = new_homeworks[0]
-                current_report['name'] = homework.get('homework_name')
-                current_report['output'] = parse_status(homework)
-            else:
-                current_report['output'] = 'Новые статусы отсутвуют.'
-            if current_report != prev_report:
-                message = current_report['output']
-                send_message(bot, message)
-                prev_report = current_report.copy()
-            else:
-                logging.debug('Статус не поменялся')
-        except exceptions.EmptyAnswerAPI as error:
-            logging.error(f'Сбой в работе программы: {error}')
-        except Exception as error:
-            logging.error(f'Сбой в работе программы: {error}')
-            current_report['output'] = error
-            if current_report != prev_report:
-                send_message(bot, message)
-                prev_report = current_report.copy()
-        finally:
-            time.sleep(RETRY_PERIOD)
+    deliver = functools.partial(
+        deliver_message, bot,
+        {account.name: account for account in registry})
+    worker = None
+    if SENDER_THREAD:
+        worker = delivery.SenderWorker(outbox, deliver)
+        worker.start()
+    stopper = lifecycle.GracefulExit()
+    stopper.install()
+    PROFILER.install()
+    try:
+        if ENGINE == 'asyncio':
+            engine = aio.AsyncEngine(
+                fetch=get_api_answer, handle_response=handle_response,
+                handle_error=handle_error, send=outbox.put,
+                concurrency=CONCURRENCY, stats=STATS, health=HEALTH,
+                profiler=PROFILER)
+            asyncio.run(engine.run(
+                plan, CYCLE_BUDGET, stopper=stopper,
+                after_cycle=lambda deadline: finish_cycle(
+                    store, registry, outbox, deliver, deadline)))
+        else:
+            while not stopper.requested:
+                delay = run_iteration(plan, store, registry, outbox,
+                                      deliver, stopper=stopper)
+                with stopper.interruptible():
+                    time.sleep(delay)
+    except exceptions.ShutdownRequested:
+        pass
+    finally:
+        stopper.restore()
+        PROFILER.restore()
+        shutdown(store, registry, outbox, deliver, worker)
 
 
 if __name__ == '__main__':
-    logging.basicConfig(
-        format=('%(asctime)s'
-                '%(name)s'
-                '%(levelname)s'
-                '%(message)s'
-                '%(funcName)s'
-                '%(lineno)d'),
-        level=logging.INFO,
-        filename="program.log",
-        filemode="w")
-    main()
+    listener = logs.setup_logging(
+        logging.getLogger(), LOG_PATH, level=LOG_LEVEL,
+        max_bytes=LOG_MAX_BYTES, backup_count=LOG_BACKUPS,
+        formatter=logs.JsonFormatter() if LOG_FORMAT == 'json' else None,
+        sampler=logs.SamplingFilter(
+            {event: LOG_SAMPLE for event in SAMPLED_EVENTS}, limit=LOG_RATE))
+    try:
+        main()
+    finally:
+        listener.stop()
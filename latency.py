@@ -0,0 +1,57 @@
+import threading
+from collections import OrderedDict, deque
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+def quantile(values, q):
+    """Квантиль q отсортированного списка методом ближайшего ранга."""
+    if not values:
+        return None
+    index = min(max(int(q * len(values) + 0.5) - 1, 0), len(values) - 1)
+    return values[index]
+
+
+class LatencyTracker:
+    """Задержки доставки уведомлений в скользящих окнах.
+
+    Хранит последние window задержек по всем аккаунтам и последние
+    account_window задержек не более max_accounts аккаунтов, получивших
+    уведомления позже остальных: память не растёт с числом аккаунтов.
+    """
+
+    def __init__(self, window=1000, account_window=20, max_accounts=1000):
+        """Создать трекер с окнами общей и поаккаунтной задержки."""
+        self.overall = deque(maxlen=window)
+        self.account_window = account_window
+        self.max_accounts = max_accounts
+        self.accounts = OrderedDict()
+        self.lock = threading.Lock()
+
+    def record(self, account, seconds):
+        """Учесть задержку доставки уведомления аккаунта."""
+        with self.lock:
+            self.overall.append(seconds)
+            samples = self.accounts.get(account)
+            if samples is None:
+                samples = self.accounts[account] = deque(
+                    maxlen=self.account_window)
+                if len(self.accounts) > self.max_accounts:
+                    self.accounts.popitem(last=False)
+            else:
+                self.accounts.move_to_end(account)
+            samples.append(seconds)
+
+    def quantiles(self, account=None):
+        """Квантили p50/p95/p99 по всем аккаунтам или по одному."""
+        with self.lock:
+            samples = self.overall if account is None else self.accounts.get(
+                account, ())
+            values = sorted(samples)
+        return {q: quantile(values, q) for q in QUANTILES}
+
+    def per_account(self):
+        """Квантили задержки для каждого отслеживаемого аккаунта."""
+        with self.lock:
+            names = list(self.accounts)
+        return {name: self.quantiles(name) for name in names}
@@ -0,0 +1,55 @@
+import contextlib
+import logging
+import signal
+import threading
+
+from exceptions import ShutdownRequested
+
+STOP_SIGNALS = (signal.SIGTERM, signal.SIGINT)
+
+
+class GracefulExit:
+    """Обработка сигналов остановки для основного цикла.
+
+    Сигнал только поднимает флаг requested, а цикл проверяет его перед
+    опросом каждого аккаунта. Если цикл в это время спит внутри
+    interruptible(), пауза прерывается исключением ShutdownRequested.
+    """
+
+    def __init__(self, signals=STOP_SIGNALS):
+        """Запомнить сигналы, по которым бот завершает работу."""
+        self.signals = signals
+        self.requested = False
+        self.sleeping = False
+        self.previous = {}
+
+    def install(self):
+        """Установить обработчики; вне главного потока ничего не делает."""
+        if threading.current_thread() is not threading.main_thread():
+            return
+        for signum in self.signals:
+            self.previous[signum] = signal.signal(signum, self._handle)
+
+    def restore(self):
+        """Вернуть обработчики, действовавшие до install()."""
+        while self.previous:
+            signum, handler = self.previous.popitem()
+            signal.signal(signum, handler)
+
+    def _handle(self, signum, frame):
+        logging.warning('Получен сигнал %s, бот останавливается',
+                        signal.Signals(signum).name)
+        self.requested = True
+        if self.sleeping:
+            raise ShutdownRequested()
+
+    @contextlib.contextmanager
+    def interruptible(self):
+        """Пауза, которую сигнал остановки прерывает немедленно."""
+        self.sleeping = True
+        try:
+            if self.requested:
+                raise ShutdownRequested()
+            yield
+        finally:
+            self.sleeping = False
@@ -0,0 +1,166 @@
+import gzip
+import json
+import logging
+import os
+import queue
+import shutil
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+LOG_FORMAT = ('%(asctime)s %(name)s %(levelname)s %(message)s '
+              '%(funcName)s %(lineno)d')
+
+
+class CompressingFileHandler(RotatingFileHandler):
+    """Ротация лога по размеру со сжатием старых файлов в gzip."""
+
+    def __init__(self, filename, max_bytes, backup_count):
+        """Создать обработчик, сжимающий архивы журнала."""
+        super().__init__(filename, maxBytes=max_bytes,
+                         backupCount=backup_count, encoding='utf-8')
+        self.namer = self._compressed_name
+        self.rotator = self._rotate
+
+    @staticmethod
+    def _compressed_name(name):
+        return name + '.gz'
+
+    @staticmethod
+    def _rotate(source, dest):
+        with open(source, 'rb') as plain, gzip.open(dest, 'wb') as packed:
+            shutil.copyfileobj(plain, packed)
+        os.remove(source)
+
+
+class JsonFormatter(logging.Formatter):
+    """Запись лога одной строкой JSON.
+
+    Поле event — шаблон сообщения без подставленных значений, по нему
+    удобно группировать однотипные записи.
+    """
+
+    def format(self, record):
+        """Сериализовать запись в JSON."""
+        entry = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'event': getattr(record, 'event', str(record.msg)),
+            'message': record.getMessage(),
+            'func': record.funcName,
+            'line': record.lineno,
+        }
+        for key in ('sampled', 'suppressed'):
+            value = getattr(record, key, None)
+            if value:
+                entry[key] = value
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """Прореживание и ограничение частоты однотипных записей.
+
+    Записи уровня ниже level группируются по шаблону сообщения: из событий,
+    перечисленных в rates, проходит каждое N-е, а каждому событию разрешено
+    не больше limit записей за period секунд. Число отброшенных лимитом
+    записей попадает в поле suppressed следующей прошедшей. Фильтр
+    срабатывает до форматирования, поэтому отброшенная запись почти
+    ничего не стоит.
+    """
+
+    def __init__(self, rates=None, limit=0, period=60, level=logging.WARNING,
+                 clock=time.monotonic, prune_size=1024):
+        """Создать фильтр с долями выборки и лимитом записей."""
+        super().__init__()
+        self.rates = dict(rates or {})
+        self.limit = limit
+        self.period = period
+        self.level = level
+        self.clock = clock
+        self.prune_size = prune_size
+        self.seen = {}
+        self.windows = {}
+        self.suppressed = {}
+        self.lock = threading.Lock()
+
+    def filter(self, record):
+        """Решить, пропускать ли запись."""
+        if record.levelno >= self.level:
+            return True
+        event = record.msg
+        with self.lock:
+            if max(len(self.seen), len(self.windows)) > self.prune_size:
+                self.seen.clear()
+                self.windows.clear()
+                self.suppressed.clear()
+            rate = self.rates.get(event, 1)
+            if rate > 1:
+                count = self.seen.get(event, 0)
+                self.seen[event] = count + 1
+                if count % rate:
+                    return False
+                record.sampled = rate
+            if self.limit:
+                now = self.clock()
+                started, count = self.windows.get(event, (now, 0))
+                if now - started >= self.period:
+                    started, count = now, 0
+                if count >= self.limit:
+                    self.windows[event] = (started, count)
+                    self.suppressed[event] = self.suppressed.get(event, 0) + 1
+                    return False
+                self.windows[event] = (started, count + 1)
+                record.suppressed = self.suppressed.pop(event, 0)
+        return True
+
+
+class DroppingQueueHandler(QueueHandler):
+    """Кладёт записи в ограниченную очередь, не блокируя вызывающий поток.
+
+    Если запись на диск не успевает, лишние записи отбрасываются и
+    подсчитываются в dropped.
+    """
+
+    def __init__(self, log_queue):
+        """Создать обработчик со счётчиком потерянных записей."""
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        """Подготовить запись к очереди, сохранив шаблон сообщения."""
+        event = str(record.msg)
+        record = super().prepare(record)
+        record.event = event
+        return record
+
+    def enqueue(self, record):
+        """Поставить запись в очередь или отбросить, если она полна."""
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def setup_logging(logger, path, level=logging.INFO, max_bytes=10 * 2 ** 20,
+                  backup_count=5, queue_size=10000, formatter=None,
+                  sampler=None):
+    """Направить записи logger в файл через очередь и фоновый поток.
+
+    sampler отбрасывает записи ещё в вызывающем потоке, до очереди.
+    Возвращает запущенный QueueListener; его stop() дописывает очередь.
+    """
+    handler = CompressingFileHandler(path, max_bytes, backup_count)
+    handler.setFormatter(formatter or logging.Formatter(LOG_FORMAT))
+    log_queue = queue.Queue(queue_size)
+    queue_handler = DroppingQueueHandler(log_queue)
+    if sampler is not None:
+        queue_handler.addFilter(sampler)
+    logger.addHandler(queue_handler)
+    logger.setLevel(level)
+    listener = QueueListener(log_queue, handler,
+                             respect_handler_level=True)
+    listener.start()
+    return listener
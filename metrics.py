@@ -0,0 +1,251 @@
+import functools
+import json
+import logging
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10,
+                   30, 60)
+
+
+def _escape(value):
+    """Экранировать значение метки для текстового формата Prometheus."""
+    return (str(value).replace('\\', '\\\\').replace('"', '\\"')
+            .replace('\n', '\\n'))
+
+
+def _labels(names, values, extra=()):
+    """Отформатировать метки sample."""
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(
+        f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _number(value):
+    """Отформатировать число для текстового формата Prometheus."""
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Счётчик с метками."""
+
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        """Создать счётчик без значений."""
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        """Увеличить счётчик."""
+        key = tuple(labels[name] for name in self.labelnames)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def get(self, **labels):
+        """Текущее значение счётчика."""
+        return self.values.get(
+            tuple(labels[name] for name in self.labelnames), 0)
+
+    def samples(self):
+        """Строки sample в текстовом формате."""
+        with self.lock:
+            items = sorted(self.values.items())
+        return [f'{self.name}{_labels(self.labelnames, key)} {_number(value)}'
+                for key, value in items]
+
+
+class Histogram:
+    """Гистограмма с метками и фиксированными границами корзин."""
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(),
+                 buckets=DEFAULT_BUCKETS):
+        """Создать гистограмму с заданными границами корзин."""
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        """Учесть наблюдение."""
+        key = tuple(labels[name] for name in self.labelnames)
+        with self.lock:
+            counts = self.values.get(key)
+            if counts is None:
+                counts = self.values[key] = [0] * len(self.buckets) + [0.0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+                    break
+            counts[-1] += value
+
+    def time(self, **labels):
+        """Декоратор, измеряющий длительность вызова функции."""
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.observe(time.perf_counter() - started, **labels)
+            return wrapper
+        return decorator
+
+    def samples(self):
+        """Строки sample в текстовом формате."""
+        with self.lock:
+            items = sorted((key, list(counts))
+                           for key, counts in self.values.items())
+        lines = []
+        for key, counts in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                labels = _labels(
+                    self.labelnames, key, [('le', _number(bound))])
+                lines.append(f'{self.name}_bucket{labels} {cumulative}')
+            lines.append(f'{self.name}_sum{_labels(self.labelnames, key)} '
+                         f'{_number(counts[-1])}')
+            lines.append(f'{self.name}_count{_labels(self.labelnames, key)} '
+                         f'{cumulative}')
+        return lines
+
+
+class Gauge:
+    """Показатель, значения которого вычисляются при каждом запросе.
+
+    kind='counter' объявляет вычисляемое значение счётчиком.
+    """
+
+    def __init__(self, name, documentation, labelnames, collect,
+                 kind='gauge'):
+        """Создать метрику, значения которой собирает collect."""
+        self.kind = kind
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.collect = collect
+
+    def samples(self):
+        """Строки sample в текстовом формате."""
+        values = self.collect()
+        if not self.labelnames:
+            values = {(): values}
+        return [f'{self.name}{_labels(self.labelnames, key)} {_number(value)}'
+                for key, value in sorted(values.items())]
+
+
+class Registry:
+    """Набор метрик процесса."""
+
+    def __init__(self):
+        """Создать пустой реестр метрик."""
+        self.metrics = {}
+
+    def register(self, metric):
+        """Добавить метрику; метрика с тем же именем заменяется."""
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        """Создать и зарегистрировать счётчик."""
+        return self.register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(),
+                  buckets=DEFAULT_BUCKETS):
+        """Создать и зарегистрировать гистограмму."""
+        return self.register(
+            Histogram(name, documentation, labelnames, buckets))
+
+    def gauge(self, name, documentation, collect, labelnames=()):
+        """Зарегистрировать показатель, вычисляемый функцией collect.
+
+        Для метрик с метками collect возвращает словарь
+        {кортеж значений меток: значение}.
+        """
+        return self.register(Gauge(name, documentation, labelnames, collect))
+
+    def computed_counter(self, name, documentation, collect, labelnames=()):
+        """Зарегистрировать счётчик, который ведётся вне реестра.
+
+        collect возвращает текущие значения так же, как для gauge().
+        """
+        return self.register(
+            Gauge(name, documentation, labelnames, collect, kind='counter'))
+
+    def render(self):
+        """Все метрики в текстовом формате Prometheus."""
+        lines = []
+        for metric in list(self.metrics.values()):
+            try:
+                samples = metric.samples()
+            except Exception as error:
+                logging.error('Не удалось собрать метрику %s: %s',
+                              metric.name, error)
+                continue
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            lines.extend(samples)
+        return '\n'.join(lines) + '\n'
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    """Обработчик HTTP-запросов к метрикам и проверке здоровья."""
+
+    registry = None
+    health = None
+
+    def do_GET(self):
+        """Отдать метрики по /metrics и состояние цикла по /health."""
+        path = self.path.split('?')[0]
+        if path == '/metrics':
+            self._reply(200, 'text/plain; version=0.0.4',
+                        self.registry.render())
+        elif path == '/health' and self.health is not None:
+            healthy, report = self.health.report()
+            self._reply(200 if healthy else 503, 'application/json',
+                        json.dumps(report))
+        else:
+            self.send_error(404)
+
+    def _reply(self, status, content_type, text):
+        body = text.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        """Не писать в лог каждый запрос к метрикам."""
+
+
+def serve(registry, port, host='0.0.0.0', health=None):
+    """Запустить HTTP-сервер метрик в фоновом потоке.
+
+    С монитором health сервер также отвечает на /health: 200, пока цикл
+    жив, и 503, если он завис.
+    """
+    handler = type('Handler', (MetricsHandler,),
+                   {'registry': registry, 'health': health})
+    server = ThreadingHTTPServer((host, port), handler)
+    threading.Thread(
+        target=server.serve_forever, name='metrics', daemon=True).start()
+    logging.info('Метрики доступны на порту %d', server.server_address[1])
+    return server
+
+
+REGISTRY = Registry()
@@ -0,0 +1,133 @@
+import cProfile
+import io
+import logging
+import os
+import pstats
+import signal
+import threading
+import time
+import tracemalloc
+
+CPU = 'cpu'
+MEMORY = 'memory'
+SIGNALS = {signal.SIGUSR1: CPU, signal.SIGUSR2: MEMORY}
+
+
+class Profiler:
+    """Профилирование нескольких циклов опроса по запросу.
+
+    request() (или сигнал SIGUSR1 для cProfile и SIGUSR2 для tracemalloc)
+    включает профилирование на следующие cycles циклов, mode запрашивает
+    его сразу при создании. Результаты
+    пишутся в directory: статистика cProfile (.prof и текстовая сводка)
+    или разница снимков tracemalloc между первым и последним циклом.
+    Пока профилирование не запрошено, цикл проверяет только флаг enabled.
+    cProfile видит лишь поток основного цикла.
+    """
+
+    def __init__(self, directory='profiles', cycles=10, mode=None, top=40):
+        """Создать выключенный профилировщик."""
+        self.directory = directory
+        self.cycles = cycles
+        self.top = top
+        self.enabled = False
+        self.requested = None
+        self.mode = None
+        self.remaining = 0
+        self.profile = None
+        self.snapshot = None
+        self.previous = {}
+        if mode:
+            self.request(mode)
+
+    def install(self):
+        """Включать профилирование по сигналам SIGUSR1 и SIGUSR2."""
+        if threading.current_thread() is not threading.main_thread():
+            return
+        for signum in SIGNALS:
+            self.previous[signum] = signal.signal(signum, self._handle)
+
+    def restore(self):
+        """Вернуть обработчики сигналов, действовавшие до install()."""
+        while self.previous:
+            signum, handler = self.previous.popitem()
+            signal.signal(signum, handler)
+
+    def _handle(self, signum, frame):
+        self.request(SIGNALS[signum])
+
+    def request(self, mode=CPU):
+        """Запросить профилирование следующих циклов."""
+        if mode not in (CPU, MEMORY):
+            raise ValueError(f'Неизвестный режим профилирования: {mode}')
+        if self.mode is None:
+            self.requested = mode
+            self.enabled = True
+
+    def cycle_started(self):
+        """Начало цикла: запустить запрошенное профилирование."""
+        if self.mode is None:
+            if self.requested is None:
+                return
+            self.mode, self.requested = self.requested, None
+            self.remaining = self.cycles
+            logging.warning('Профилирование %s на %d циклов',
+                            self.mode, self.cycles)
+            if self.mode == MEMORY:
+                tracemalloc.start()
+                self.snapshot = tracemalloc.take_snapshot()
+            else:
+                self.profile = cProfile.Profile()
+        if self.profile is not None:
+            self.profile.enable()
+
+    def cycle_finished(self):
+        """Конец цикла: после последнего цикла записать результаты."""
+        if self.mode is None:
+            return
+        if self.profile is not None:
+            self.profile.disable()
+        self.remaining -= 1
+        if self.remaining > 0:
+            return
+        path = os.path.join(self.directory, '{}-{}-{}'.format(
+            self.mode, time.strftime('%Y%m%d-%H%M%S'), os.getpid()))
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            if self.mode == MEMORY:
+                self._dump_memory(path)
+            else:
+                self._dump_cpu(path)
+        except OSError as error:
+            logging.error('Не удалось записать результаты профилирования: %s',
+                          error)
+        else:
+            logging.warning('Результаты профилирования записаны в %s.*', path)
+        finally:
+            self._reset()
+
+    def _reset(self):
+        """Завершить профилирование и освободить собранные данные."""
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+        self.profile = None
+        self.snapshot = None
+        self.mode = None
+        self.enabled = self.requested is not None
+
+    def _dump_cpu(self, path):
+        self.profile.dump_stats(path + '.prof')
+        report = io.StringIO()
+        pstats.Stats(self.profile, stream=report).sort_stats(
+            'cumulative').print_stats(self.top)
+        with open(path + '.txt', 'w', encoding='utf-8') as file:
+            file.write(report.getvalue())
+
+    def _dump_memory(self, path):
+        snapshot = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+        snapshot.dump(path + '.tracemalloc')
+        with open(path + '.txt', 'w', encoding='utf-8') as file:
+            for stat in snapshot.compare_to(self.snapshot, 'lineno')[
+                    :self.top]:
+                file.write(f'{stat}\n')
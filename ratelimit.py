@@ -0,0 +1,67 @@
+import time
+
+
+class TokenBucket:
+    """Ведро токенов: rate токенов в секунду, не больше capacity."""
+
+    __slots__ = ('rate', 'capacity', 'tokens', 'updated')
+
+    def __init__(self, rate, capacity, now):
+        """Создать полное ведро токенов."""
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = now
+
+    def wait_time(self, now):
+        """Секунды до появления токена; 0, если токен есть."""
+        self.tokens = min(
+            self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            return 0
+        return (1 - self.tokens) / self.rate
+
+    def consume(self):
+        """Забрать токен."""
+        self.tokens -= 1
+
+
+class SendLimiter:
+    """Ограничение частоты отправки в Telegram: общее и для каждого чата.
+
+    Для чата хранится только время, раньше которого в него нельзя писать;
+    прошедшие отметки удаляются, когда их становится много.
+    """
+
+    def __init__(self, global_rate=30, chat_rate=1, clock=time.monotonic,
+                 prune_size=10000):
+        """Создать ограничитель с общим лимитом и лимитом на чат."""
+        self.clock = clock
+        self.bucket = TokenBucket(global_rate, global_rate, clock())
+        self.chat_interval = 1 / chat_rate
+        self.chat_next = {}
+        self.prune_size = prune_size
+
+    def global_wait(self):
+        """Секунды до разрешения следующей отправки в любой чат."""
+        return self.bucket.wait_time(self.clock())
+
+    def chat_wait(self, chat_id):
+        """Секунды до разрешения отправки в чат."""
+        return max(self.chat_next.get(chat_id, 0) - self.clock(), 0)
+
+    def consume(self, chat_id):
+        """Учесть отправку сообщения в чат."""
+        now = self.clock()
+        self.bucket.consume()
+        self.chat_next[chat_id] = now + self.chat_interval
+        if len(self.chat_next) > self.prune_size:
+            self.chat_next = {
+                chat: moment for chat, moment in self.chat_next.items()
+                if moment > now}
+
+    def block_chat(self, chat_id, seconds):
+        """Запретить отправку в чат на seconds секунд (RetryAfter)."""
+        self.chat_next[chat_id] = max(
+            self.chat_next.get(chat_id, 0), self.clock() + seconds)
@@ -0,0 +1,73 @@
+"""Воспроизведение записанных ответов API Практикума.
+
+replay() прогоняет журнал, записанный при BOT_RECORD_PATH, через разбор,
+сравнение статусов и очередь уведомлений с записанной или ускоренной
+скоростью, без запросов к API:
+
+    python replay.py recording.jsonl.gz --speed 0
+"""
+import argparse
+import json
+import time
+
+import accounts
+import delivery
+import homework
+import transport
+
+
+def replay(records, speed=0.0, sleep=time.sleep, clock=time.perf_counter):
+    """Прогнать записанные ответы через обработку и очередь уведомлений.
+
+    Ответы подаются в записанном порядке; при speed > 0 выдерживаются
+    записанные промежутки между запросами, делённые на speed.
+    Возвращает сводку прогона.
+    """
+    if isinstance(records, str):
+        records = transport.load_records(records)
+    registry = {}
+    outbox = delivery.Outbox()
+    delivered = []
+    started = clock()
+    first = records[0]['t'] if records else 0
+    for record in records:
+        if speed > 0:
+            sleep(max((record['t'] - first) / speed - (clock() - started), 0))
+        name = record['account']
+        account = registry.get(name)
+        if account is None:
+            account = registry[name] = accounts.Account(name, '', name)
+        with accounts.activate(account):
+            try:
+                messages = homework.handle_response(
+                    account,
+                    homework.read_api_answer(
+                        transport.ReplayedResponse(record)))
+            except Exception as error:
+                messages = homework.handle_error(account, error)
+        for text, updated in messages:
+            outbox.put(name, account.chat_id, text, updated)
+        outbox.drain(lambda message: delivered.append(message) or True)
+    elapsed = clock() - started
+    return {
+        'responses': len(records),
+        'accounts': len(registry),
+        'messages': len(delivered),
+        'seconds': round(elapsed, 6),
+        'responses_per_second': round(len(records) / elapsed, 1)
+        if elapsed else None,
+    }
+
+
+def main(argv=None):
+    """Точка входа воспроизведения журнала."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('path', help='журнал, записанный BOT_RECORD_PATH')
+    parser.add_argument('--speed', type=float, default=0,
+                        help='ускорение; 0 — без пауз')
+    options = parser.parse_args(argv)
+    print(json.dumps(replay(options.path, options.speed)))
+
+
+if __name__ == '__main__':
+    main()
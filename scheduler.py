@@ -0,0 +1,108 @@
+import heapq
+import itertools
+import math
+import random
+import time
+
+import exceptions
+
+BACKOFF_ERRORS = (exceptions.OrigExceptError, exceptions.OrigHTTPError,
+                  exceptions.CircuitOpenError)
+RETRY_AFTER_ERRORS = (exceptions.ApiThrottledError,
+                      exceptions.CircuitOpenError)
+
+
+class Scheduler:
+    """Адаптивное расписание опроса аккаунтов.
+
+    Пока работа на проверке, аккаунт опрашивается чаще; после сетевых и
+    HTTP-ошибок интервал растёт экспоненциально со случайным разбросом, а
+    если сервер назвал время повтора (Retry-After), ждём ровно его;
+    аккаунты без изменений долгое время опрашиваются реже. Счётчики
+    ошибок и опросов без изменений хранятся в самих аккаунтах (failures
+    и idle), а не в словарях по имени.
+    """
+
+    def __init__(self, period=600, review_period=120, idle_period=1800,
+                 idle_after=36, backoff_base=30, backoff_max=3600,
+                 jitter=0.1, clock=time.monotonic, rng=None):
+        """Создать планировщик с периодами опроса и отсрочки."""
+        self.period = period
+        self.review_period = review_period
+        self.idle_period = idle_period
+        self.idle_after = idle_after
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.jitter = jitter
+        self.clock = clock
+        self.rng = rng or random.Random()
+        self.queue = []
+        self.counter = itertools.count()
+
+    def add(self, account, due=None):
+        """Поставить аккаунт в расписание; по умолчанию — опросить сразу."""
+        due = self.clock() if due is None else due
+        heapq.heappush(self.queue, (due, next(self.counter), account))
+
+    def due(self):
+        """Извлечь аккаунты, время опроса которых наступило."""
+        now = self.clock()
+        ready = []
+        while self.queue and self.queue[0][0] <= now:
+            ready.append(heapq.heappop(self.queue)[2])
+        return ready
+
+    def delay(self):
+        """Секунды до следующего запланированного опроса."""
+        if not self.queue:
+            return self.period
+        return max(math.ceil(self.queue[0][0] - self.clock()), 0)
+
+    def interval(self, account, changed=False, error=None):
+        """Рассчитать интервал до следующего опроса аккаунта."""
+        if isinstance(error, BACKOFF_ERRORS):
+            account.failures = failures = account.failures + 1
+            if (isinstance(error, RETRY_AFTER_ERRORS)
+                    and error.retry_after is not None):
+                return error.retry_after
+            backoff = min(
+                self.backoff_base * 2 ** (failures - 1), self.backoff_max)
+            return backoff * self.rng.uniform(
+                1 - self.jitter, 1 + self.jitter)
+        account.failures = 0
+        if error is None and not changed:
+            account.idle += 1
+        else:
+            account.idle = 0
+        if 'reviewing' in account.statuses.values():
+            return self.review_period
+        if account.idle >= self.idle_after:
+            return self.idle_period
+        return self.period
+
+    def report(self, account, changed=False, error=None):
+        """Учесть результат опроса и запланировать следующий."""
+        interval = self.interval(account, changed, error)
+        self.add(account, self.clock() + interval)
+        return interval
+
+
+class Deadline:
+    """Бюджет времени одного цикла опроса."""
+
+    def __init__(self, budget, clock=time.monotonic):
+        """Отсчитать бюджет budget секунд от текущего момента."""
+        self.clock = clock
+        self.expires = clock() + budget
+
+    def remaining(self):
+        """Секунды, оставшиеся до конца бюджета."""
+        return self.expires - self.clock()
+
+    def check(self, stage):
+        """Выбросить DeadlineExceeded, если бюджет цикла исчерпан."""
+        overrun = -self.remaining()
+        if overrun >= 0:
+            raise exceptions.DeadlineExceeded(
+                f'Бюджет цикла исчерпан на этапе "{stage}" '
+                f'(превышение {overrun:.1f} с)')
@@ -0,0 +1,317 @@
+"""Симуляция основного цикла бота на виртуальных часах.
+
+Настоящие расписание, обработка ответов, очередь отправки и автомат
+защиты работают против модели API, а время идёт только по виртуальным
+часам, поэтому дни опроса укладываются в доли секунды. Результат —
+трасса запросов к API и сообщений и сводка: число запросов и задержка
+уведомлений, чтобы сравнивать политики расписания:
+
+    python simulation.py --accounts 100 --days 7 --policy review_period=300
+"""
+import argparse
+import contextlib
+import json
+import math
+import random
+from collections import namedtuple
+
+import accounts
+import breaker
+import delivery
+import health
+import homework
+import latency
+import ratelimit
+import state
+import stubs
+
+TraceEvent = namedtuple('TraceEvent', ('time', 'kind', 'account', 'detail'))
+
+
+class VirtualClock:
+    """Часы, которые идут только по команде.
+
+    Вызов возвращает монотонное время, time() — время UNIX.
+    """
+
+    def __init__(self, epoch=1700000000.0):
+        """Создать часы, стоящие в нулевой момент."""
+        self.epoch = epoch
+        self.now = 0.0
+
+    def __call__(self):
+        """Текущее монотонное время."""
+        return self.now
+
+    def time(self):
+        """Текущее время UNIX."""
+        return self.epoch + self.now
+
+    def sleep(self, seconds):
+        """Перевести часы вперёд на seconds секунд."""
+        self.now += max(seconds, 0)
+
+
+class World:
+    """Модель API Практикума: статусы работ меняются в случайные моменты.
+
+    Время до следующей смены статуса распределено экспоненциально со
+    средним review_time секунд и не зависит от того, как часто бот
+    опрашивает API. В интервалы outages (start, end) API отвечает 503
+    с Retry-After, кроме того с вероятностью error_rate — 500.
+    """
+
+    def __init__(self, clock, homeworks=3, review_time=6 * 3600,
+                 error_rate=0.0, outages=(), rng=None):
+        """Создать модель API Практикума."""
+        self.clock = clock
+        self.homeworks = homeworks
+        self.review_time = review_time
+        self.error_rate = error_rate
+        self.outages = tuple(outages)
+        self.rng = rng or random.Random()
+        self.accounts = {}
+        self.changes = 0
+
+    def _homework(self, token, index):
+        """Новая работа токена на начальном статусе."""
+        return {
+            'id': index,
+            'homework_name': f'{token[-8:]}_hw{index}.zip',
+            'step': 0,
+            'updated': self.clock.time(),
+            'next_change': self.clock.time() + self.rng.expovariate(
+                1 / self.review_time),
+        }
+
+    def _advance(self, item, now):
+        """Применить к работе смены статуса, наступившие к now."""
+        while item['next_change'] <= now:
+            item['step'] = (item['step'] + 1) % len(stubs.STATUS_CYCLE)
+            item['updated'] = item['next_change']
+            item['next_change'] += self.rng.expovariate(1 / self.review_time)
+            self.changes += 1
+
+    def outage(self):
+        """Секунды до конца текущего сбоя API или None."""
+        for start, end in self.outages:
+            if start <= self.clock() < end:
+                return end - self.clock()
+        return None
+
+    def answer(self, token, from_date):
+        """Код ответа, заголовки и тело ответа API для токена."""
+        remaining = self.outage()
+        if remaining is not None:
+            return 503, {'Retry-After': str(math.ceil(remaining))}, {}
+        if self.rng.random() < self.error_rate:
+            return 500, {}, {}
+        now = self.clock.time()
+        homeworks = self.accounts.get(token)
+        if homeworks is None:
+            homeworks = self.accounts[token] = [
+                self._homework(token, index)
+                for index in range(self.homeworks)]
+        for item in homeworks:
+            self._advance(item, now)
+        return 200, {}, {
+            'homeworks': [
+                {'id': item['id'],
+                 'homework_name': item['homework_name'],
+                 'status': stubs.STATUS_CYCLE[item['step']],
+                 'date_updated': stubs.isoformat(item['updated'])}
+                for item in sorted(homeworks, reverse=True,
+                                   key=lambda item: item['updated'])
+                if not from_date or item['updated'] >= from_date],
+            'current_date': int(now),
+        }
+
+
+class SimulatedResponse:
+    """Ответ API в интерфейсе requests.Response, нужном get_api_answer."""
+
+    def __init__(self, status_code, headers, body):
+        """Создать ответ с готовым телом."""
+        self.status_code = status_code
+        self.headers = headers
+        self.body = body
+
+    def json(self):
+        """Тело ответа."""
+        return self.body
+
+
+class SimulatedTransport:
+    """Транспорт вместо HTTP-сессии: отвечает из модели и пишет трассу.
+
+    Каждый запрос переводит часы на latency секунд.
+    """
+
+    def __init__(self, world, clock, trace, names, latency=0.2):
+        """Создать транспорт поверх модели мира."""
+        self.world = world
+        self.clock = clock
+        self.trace = trace
+        self.names = names
+        self.latency = latency
+        self.requests = 0
+
+    def get(self, url, headers=None, params=None, timeout=None):
+        """Ответить на запрос из модели API."""
+        self.clock.sleep(self.latency)
+        self.requests += 1
+        token = (headers or {}).get('Authorization', '')
+        status, response_headers, body = self.world.answer(
+            token, (params or {}).get('from_date', 0))
+        self.trace.append(TraceEvent(
+            self.clock(), 'poll', self.names.get(token, token), status))
+        return SimulatedResponse(status, response_headers, body)
+
+    def stats(self):
+        """Счётчики запросов в формате PooledSession."""
+        return {'opened': 0, 'reused': 0, 'requests': self.requests,
+                'bytes': 0}
+
+
+class Simulation:
+    """Основной цикл бота на виртуальных часах.
+
+    policy переопределяет параметры расписания (period, review_period,
+    idle_period, idle_after, backoff_base, backoff_max, jitter).
+    """
+
+    def __init__(self, accounts_count=10, homeworks=3, review_time=6 * 3600,
+                 api_latency=0.2, error_rate=0.0, outages=(), policy=None,
+                 seed=0):
+        """Собрать модель мира, аккаунты и бота на виртуальных часах."""
+        self.clock = VirtualClock()
+        rng = random.Random(seed)
+        self.registry = [
+            accounts.Account(f'student{index:05d}', f'token-{index:05d}',
+                             str(100000 + index))
+            for index in range(accounts_count)]
+        self.trace = []
+        self.world = World(self.clock, homeworks, review_time, error_rate,
+                           outages, rng)
+        self.transport = SimulatedTransport(
+            self.world, self.clock, self.trace,
+            {account.headers['Authorization']: account.name
+             for account in self.registry}, api_latency)
+        self.plan = homework.create_scheduler(
+            self.registry, clock=self.clock, rng=rng, **(policy or {}))
+        self.latency = latency.LatencyTracker(window=100000)
+        self.outbox = delivery.Outbox(
+            limiter=ratelimit.SendLimiter(
+                homework.TELEGRAM_RATE, homework.TELEGRAM_CHAT_RATE,
+                clock=self.clock),
+            window=homework.DIGEST_WINDOW, on_delivered=self._delivered,
+            clock=self.clock, wall_clock=self.clock.time)
+        self.store = state.open_store('')
+        self.cycles = 0
+
+    def deliver(self, message):
+        """Отправить сообщение: записать его в трассу."""
+        self.trace.append(TraceEvent(
+            self.clock(), 'message', message.account, message.text))
+        return True
+
+    def _delivered(self, message):
+        if message.updated is not None:
+            self.latency.record(
+                message.account, self.clock.time() - message.updated)
+
+    @contextlib.contextmanager
+    def installed(self):
+        """Подменить транспорт и часы модуля homework на время симуляции."""
+        saved = (homework.SESSION, homework.BREAKER, homework.HEALTH,
+                 homework.SENDER_THREAD)
+        homework.SESSION = self.transport
+        homework.BREAKER = breaker.CircuitBreaker(
+            homework.ENDPOINT, failure_rate=homework.BREAKER_FAILURE_RATE,
+            open_timeout=homework.BREAKER_TIMEOUT, clock=self.clock)
+        homework.HEALTH = health.Monitor(
+            homework.STALL_AFTER, clock=self.clock,
+            wall_clock=self.clock.time)
+        homework.SENDER_THREAD = False
+        try:
+            yield
+        finally:
+            (homework.SESSION, homework.BREAKER, homework.HEALTH,
+             homework.SENDER_THREAD) = saved
+
+    def run(self, seconds):
+        """Прогнать основной цикл на seconds виртуальных секунд."""
+        until = self.clock() + seconds
+        with self.installed():
+            while self.clock() < until:
+                delay = homework.run_iteration(
+                    self.plan, self.store, self.registry, self.outbox,
+                    self.deliver, clock=self.clock)
+                self.cycles += 1
+                self.clock.sleep(min(delay, until - self.clock()))
+        return self.summary()
+
+    def summary(self):
+        """Сводка прогона: стоимость опроса и задержка уведомлений."""
+        days = max(self.clock() / 86400, 1 / 86400)
+        polls = [event for event in self.trace if event.kind == 'poll']
+        quantiles = self.latency.quantiles()
+        return {
+            'accounts': len(self.registry),
+            'simulated_days': round(self.clock() / 86400, 3),
+            'cycles': self.cycles,
+            'api_calls': len(polls),
+            'api_errors': sum(event.detail != 200 for event in polls),
+            'api_calls_per_account_day': round(
+                len(polls) / len(self.registry) / days, 1),
+            'status_changes': self.world.changes,
+            'messages': sum(event.kind == 'message' for event in self.trace),
+            'notify_p50_seconds': quantiles[0.5],
+            'notify_p99_seconds': quantiles[0.99],
+        }
+
+    def write_trace(self, path):
+        """Записать трассу в файл JSON Lines."""
+        with open(path, 'w', encoding='utf-8') as file:
+            for event in self.trace:
+                file.write(json.dumps(event._asdict(), ensure_ascii=False))
+                file.write('\n')
+
+
+def parse_policy(items):
+    """Разобрать параметры расписания вида key=value."""
+    policy = {}
+    for item in items:
+        key, _, value = item.partition('=')
+        policy[key] = float(value)
+    return policy
+
+
+def main(argv=None):
+    """Точка входа симуляции."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--accounts', type=int, default=10)
+    parser.add_argument('--days', type=float, default=1)
+    parser.add_argument('--homeworks', type=int, default=3)
+    parser.add_argument('--review-time', type=float, default=6 * 3600,
+                        help='среднее время до смены статуса, с')
+    parser.add_argument('--api-latency', type=float, default=0.2)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--policy', action='append', default=[],
+                        metavar='KEY=VALUE',
+                        help='параметр расписания, например period=300')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--trace', help='файл для трассы JSON Lines')
+    options = parser.parse_args(argv)
+    simulation = Simulation(
+        options.accounts, options.homeworks, options.review_time,
+        options.api_latency, options.error_rate,
+        policy=parse_policy(options.policy), seed=options.seed)
+    result = simulation.run(options.days * 86400)
+    if options.trace:
+        simulation.write_trace(options.trace)
+    print(json.dumps(result, ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
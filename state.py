@@ -0,0 +1,242 @@
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+
+
+class MemoryStore:
+    """Состояние бота в памяти: курсоры и последние статусы работ.
+
+    Изменения копятся в пакете и записываются в хранилище одним вызовом
+    flush() в конце цикла опроса. Дисковые хранилища не держат в памяти
+    копию состояния: во время работы оно есть только в аккаунтах,
+    а get_cursor() и get_statuses() читают его при загрузке.
+    """
+
+    def __init__(self):
+        """Создать пустое хранилище."""
+        self.cursors = {}
+        self.statuses = {}
+        self.pending_cursors = {}
+        self.pending_statuses = {}
+
+    def get_cursor(self, account, default=0):
+        """Вернуть курсор аккаунта."""
+        return self.cursors.get(account, default)
+
+    def get_statuses(self, account):
+        """Вернуть последние отправленные статусы работ аккаунта."""
+        return dict(self.statuses.get(account, {}))
+
+    def set_cursor(self, account, cursor):
+        """Запомнить новый курсор аккаунта."""
+        self.pending_cursors[account] = cursor
+
+    def set_status(self, account, homework, status):
+        """Запомнить последний отправленный статус работы."""
+        self.pending_statuses[(account, homework)] = status
+
+    def flush(self):
+        """Записать накопленный пакет изменений."""
+        if not self.pending_cursors and not self.pending_statuses:
+            return
+        self._write(self.pending_cursors, self.pending_statuses)
+        self.pending_cursors = {}
+        self.pending_statuses = {}
+
+    def _write(self, cursors, statuses):
+        """Применить пакет изменений к состоянию в памяти."""
+        self.cursors.update(cursors)
+        for (account, homework), status in statuses.items():
+            self.statuses.setdefault(account, {})[homework] = status
+
+    def close(self):
+        """Записать изменения и освободить ресурсы."""
+        self.flush()
+
+
+class SQLiteStore(MemoryStore):
+    """Состояние в SQLite: каждый пакет пишется одной транзакцией."""
+
+    def __init__(self, path):
+        """Открыть базу SQLite и создать таблицы."""
+        super().__init__()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        with self.connection:
+            self.connection.execute(
+                'CREATE TABLE IF NOT EXISTS cursors ('
+                'account TEXT PRIMARY KEY, cursor INTEGER NOT NULL)')
+            self.connection.execute(
+                'CREATE TABLE IF NOT EXISTS statuses ('
+                'account TEXT NOT NULL, homework TEXT NOT NULL, '
+                'status TEXT NOT NULL, PRIMARY KEY (account, homework))')
+
+    def get_cursor(self, account, default=0):
+        """Прочитать курсор аккаунта из базы."""
+        row = self.connection.execute(
+            'SELECT cursor FROM cursors WHERE account = ?',
+            (account,)).fetchone()
+        return default if row is None else row[0]
+
+    def get_statuses(self, account):
+        """Прочитать статусы работ аккаунта из базы."""
+        return dict(self.connection.execute(
+            'SELECT homework, status FROM statuses WHERE account = ?',
+            (account,)))
+
+    def _write(self, cursors, statuses):
+        """Записать пакет изменений одной транзакцией."""
+        with self.connection:
+            self.connection.executemany(
+                'INSERT OR REPLACE INTO cursors VALUES (?, ?)',
+                cursors.items())
+            self.connection.executemany(
+                'INSERT OR REPLACE INTO statuses VALUES (?, ?, ?)',
+                [(account, homework, status)
+                 for (account, homework), status in statuses.items()])
+
+    def close(self):
+        """Записать изменения и закрыть базу."""
+        super().close()
+        self.connection.close()
+
+
+class JournalStore(MemoryStore):
+    """Состояние в журнале JSON-строк, который только дописывается.
+
+    Недописанная при сбое последняя строка отбрасывается при чтении. Когда
+    журнал разрастается, он переписывается компактным снимком. Прочитанное
+    из журнала состояние хранится только до первой записи пакета.
+    """
+
+    def __init__(self, path, compact_ratio=4):
+        """Открыть журнал и загрузить из него состояние."""
+        super().__init__()
+        self.path = path
+        self.compact_ratio = compact_ratio
+        self.records = 0
+        self.live = 0
+        self.loaded = False
+        if os.path.exists(path):
+            self._replay()
+
+    def get_cursor(self, account, default=0):
+        """Вернуть курсор аккаунта из журнала."""
+        self._load()
+        return super().get_cursor(account, default)
+
+    def get_statuses(self, account):
+        """Вернуть статусы работ аккаунта из журнала."""
+        self._load()
+        return super().get_statuses(account)
+
+    def _load(self):
+        """Прочитать журнал, если прочитанное состояние уже сброшено."""
+        if not self.loaded and os.path.exists(self.path):
+            self._replay()
+
+    def _replay(self):
+        """Восстановить состояние, прочитав журнал.
+
+        Недописанный хвост без перевода строки обрезается, чтобы следующий
+        пакет не приклеился к нему и не потерялся вместе с ним.
+        """
+        self.cursors, self.statuses, self.records = {}, {}, 0
+        complete = 0
+        with open(self.path, 'rb') as journal:
+            for line in journal:
+                if not line.endswith(b'\n'):
+                    logging.warning(
+                        'Обрезан недописанный хвост журнала %s', self.path)
+                    break
+                complete += len(line)
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    logging.warning(
+                        'Пропущена повреждённая запись журнала %s', self.path)
+                    continue
+                self.records += 1
+                if 'h' in record:
+                    self.statuses.setdefault(
+                        record['a'], {})[record['h']] = record['s']
+                else:
+                    self.cursors[record['a']] = record['c']
+        if complete < os.path.getsize(self.path):
+            with open(self.path, 'r+b') as journal:
+                journal.truncate(complete)
+        self.live = self._live_records()
+        self.loaded = True
+
+    def _live_records(self):
+        """Число записей в компактном снимке состояния."""
+        return len(self.cursors) + sum(map(len, self.statuses.values()))
+
+    def _release(self):
+        """Забыть прочитанное из журнала состояние."""
+        self.cursors, self.statuses, self.loaded = {}, {}, False
+
+    def _write(self, cursors, statuses):
+        """Дописать пакет в журнал или переписать журнал снимком.
+
+        Число живых записей известно с последнего чтения журнала и может
+        отставать, поэтому сжатие иногда выполняется раньше нужного.
+        """
+        self._release()
+        lines = [json.dumps({'a': account, 'c': cursor})
+                 for account, cursor in cursors.items()]
+        lines.extend(
+            json.dumps({'a': account, 'h': homework, 's': status},
+                       ensure_ascii=False)
+            for (account, homework), status in statuses.items())
+        if (self.records + len(lines)
+                > self.compact_ratio * max(self.live, 1)):
+            self._compact(cursors, statuses)
+            return
+        with open(self.path, 'a', encoding='utf-8') as journal:
+            journal.write('\n'.join(lines) + '\n')
+            journal.flush()
+            os.fsync(journal.fileno())
+        self.records += len(lines)
+
+    def _compact(self, cursors, statuses):
+        """Атомарно заменить журнал снимком состояния с пакетом."""
+        self._load()
+        super()._write(cursors, statuses)
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as journal:
+                for account, cursor in self.cursors.items():
+                    journal.write(json.dumps({'a': account, 'c': cursor}))
+                    journal.write('\n')
+                for account, homeworks in self.statuses.items():
+                    for homework, status in homeworks.items():
+                        journal.write(json.dumps(
+                            {'a': account, 'h': homework, 's': status},
+                            ensure_ascii=False))
+                        journal.write('\n')
+                journal.flush()
+                os.fsync(journal.fileno())
+            os.replace(tmp_path, self.path)
+        except OSError:
+            os.unlink(tmp_path)
+            raise
+        self.records = self.live = self._live_records()
+        self._release()
+
+
+def open_store(path):
+    """Открыть хранилище состояния по пути.
+
+    Пустой путь — состояние только в памяти, файлы .jsonl — журнал,
+    остальные пути — база SQLite.
+    """
+    if not path:
+        return MemoryStore()
+    if path.endswith('.jsonl'):
+        return JournalStore(path)
+    return SQLiteStore(path)
@@ -0,0 +1,195 @@
+import datetime
+import json
+import random
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+STATUS_CYCLE = ('reviewing', 'rejected', 'reviewing', 'approved')
+
+
+def isoformat(timestamp):
+    """Время в формате date_updated API Практикума."""
+    moment = datetime.datetime.fromtimestamp(timestamp, datetime.timezone.utc)
+    return moment.isoformat().replace('+00:00', 'Z')
+
+
+class StubServer(ThreadingHTTPServer):
+    """Локальный HTTP-сервер заглушки в фоновом потоке."""
+
+    daemon_threads = True
+
+    def __init__(self, handler, host='127.0.0.1', port=0):
+        """Создать сервер на свободном порту; запускается через start."""
+        super().__init__((host, port), handler)
+        self.lock = threading.Lock()
+        self.thread = threading.Thread(
+            target=self.serve_forever, name=type(self).__name__, daemon=True)
+
+    @property
+    def url(self):
+        """Адрес сервера вида http://host:port."""
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self):
+        """Запустить сервер."""
+        self.thread.start()
+        return self
+
+    def stop(self):
+        """Остановить сервер и закрыть сокет."""
+        self.shutdown()
+        self.server_close()
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Общая часть обработчиков заглушек: keep-alive и ответ JSON."""
+
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def reply(self, status, payload):
+        """Отправить ответ с телом JSON."""
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        """Не писать в лог каждый запрос к заглушке."""
+
+
+class PracticumHandler(StubHandler):
+    """Заглушка homework_statuses/ API Практикума."""
+
+    def do_GET(self):
+        """Ответить списком работ, изменившихся с from_date."""
+        server = self.server
+        if server.latency:
+            time.sleep(server.latency)
+        query = urllib.parse.parse_qs(urllib.parse.urlsplit(self.path).query)
+        token = self.headers.get('Authorization', '')
+        with server.lock:
+            server.requests += 1
+            if server.rng.random() < server.error_rate:
+                server.errors += 1
+                failed = True
+            else:
+                failed = False
+                homeworks = server.poll(token, query)
+        if failed:
+            self.reply(500, {'message': 'Internal Server Error'})
+        else:
+            self.reply(200, {'homeworks': homeworks,
+                             'current_date': int(server.clock())})
+
+
+class PracticumStub(StubServer):
+    """Практикум с настраиваемыми задержкой, долей ошибок и объёмом ответа.
+
+    У каждого токена homeworks работ; при каждом опросе с вероятностью
+    change_rate одна из них меняет статус. В ответ попадают работы,
+    изменившиеся не раньше from_date, и все работы при from_date=0;
+    начальный статус датирован первым опросом токена.
+    padding добавляет к каждой работе комментарий такой длины.
+    """
+
+    def __init__(self, latency=0.0, error_rate=0.0, homeworks=3,
+                 change_rate=0.1, padding=0, seed=None, clock=time.time,
+                 **kwargs):
+        """Создать заглушку API Практикума."""
+        super().__init__(PracticumHandler, **kwargs)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.homeworks = homeworks
+        self.change_rate = change_rate
+        self.comment = 'x' * padding
+        self.rng = random.Random(seed)
+        self.clock = clock
+        self.accounts = {}
+        self.requests = 0
+        self.errors = 0
+        self.changes = 0
+
+    def _homework(self, token, index, now):
+        return {
+            'id': index,
+            'homework_name': f'{token[-8:]}_hw{index}.zip',
+            'status': STATUS_CYCLE[0],
+            'reviewer_comment': self.comment,
+            'date_updated': now,
+            'step': 0,
+        }
+
+    def poll(self, token, query):
+        """Работы токена, изменившиеся с from_date; вызывается под lock."""
+        now = self.clock()
+        homeworks = self.accounts.get(token)
+        if homeworks is None:
+            homeworks = self.accounts[token] = [
+                self._homework(token, index, now)
+                for index in range(self.homeworks)]
+        if homeworks and self.rng.random() < self.change_rate:
+            homework = self.rng.choice(homeworks)
+            homework['step'] = (homework['step'] + 1) % len(STATUS_CYCLE)
+            homework['status'] = STATUS_CYCLE[homework['step']]
+            homework['date_updated'] = now
+            self.changes += 1
+        try:
+            since = int(query.get('from_date', ['0'])[0])
+        except ValueError:
+            since = 0
+        return [
+            dict(homework, date_updated=isoformat(homework['date_updated']))
+            for homework in sorted(homeworks, reverse=True,
+                                   key=lambda item: item['date_updated'])
+            if since == 0 or homework['date_updated'] >= since]
+
+
+class TelegramHandler(StubHandler):
+    """Заглушка метода sendMessage Bot API."""
+
+    def do_POST(self):
+        """Принять сообщение и ответить как Bot API."""
+        server = self.server
+        length = int(self.headers.get('Content-Length', 0))
+        raw = self.rfile.read(length).decode('utf-8')
+        if not self.path.endswith('/sendMessage'):
+            self.reply(404, {'ok': False, 'error_code': 404,
+                             'description': 'Not Found'})
+            return
+        if self.headers.get('Content-Type', '').startswith('application/json'):
+            data = json.loads(raw or '{}')
+        else:
+            data = {key: values[0] for key, values in
+                    urllib.parse.parse_qs(raw).items()}
+        if server.latency:
+            time.sleep(server.latency)
+        with server.lock:
+            server.messages.append((data.get('chat_id'), data.get('text')))
+            message_id = len(server.messages)
+        self.reply(200, {'ok': True, 'result': {
+            'message_id': message_id,
+            'date': int(time.time()),
+            'chat': {'id': int(data.get('chat_id', 0)), 'type': 'private'},
+            'text': data.get('text', ''),
+        }})
+
+
+class TelegramStub(StubServer):
+    """Bot API, запоминающий отправленные сообщения."""
+
+    def __init__(self, latency=0.0, **kwargs):
+        """Создать заглушку Telegram Bot API."""
+        super().__init__(TelegramHandler, **kwargs)
+        self.latency = latency
+        self.messages = []
+
+    @property
+    def base_url(self):
+        """Значение base_url для telegram.Bot."""
+        return self.url + '/bot'
@@ -53,3 +53,10 @@ pytest_timeout.write = write_timeout_reasons
 os.environ['PRACTICUM_TOKEN'] = 'sometoken'
 os.environ['TELEGRAM_TOKEN'] = '1234:abcdefg'
 os.environ['TELEGRAM_CHAT_ID'] = '12345'
+# тесты подменяют requests.get, поэтому пул соединений отключён
+os.environ['PR_POOL_SIZE'] = '0'
+# состояние бота в тестах не сохраняется на диск
+os.environ['BOT_STATE_PATH'] = ''
+os.environ['BOT_OUTBOX_PATH'] = ''
+# сообщения отправляются в цикле main(), а не в фоновом потоке
+os.environ['BOT_SENDER_THREAD'] = '0'
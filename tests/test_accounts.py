@@ -0,0 +1,60 @@
+import json
+
+import pytest
+
+import accounts
+import exceptions
+
+
+class TestAccounts:
+    def test_load_accounts_from_file(self, tmp_path):
+        path = tmp_path / 'accounts.json'
+        path.write_text(json.dumps([
+            {'name': 'ann', 'token': 't1', 'chat_id': 1},
+            {'token': 't2', 'chat_id': '2'},
+        ]))
+        registry = accounts.load_accounts(str(path))
+        assert [account.name for account in registry] == ['ann', 'accounts-1']
+        assert registry[0].chat_id == '1'
+        assert registry[1].headers == {'Authorization': 'OAuth t2'}
+
+    def test_account_is_compact(self):
+        account = accounts.Account('ann', 't1', '1')
+        assert not hasattr(account, '__dict__')
+        assert account.pending is None
+        account.remember('1', 'approved')
+        assert account.saved() == [('1', 'approved')]
+        assert account.saved() == ()
+        assert account.statuses == {'1': 'approved'}
+
+    def test_load_accounts_from_directory(self, tmp_path):
+        (tmp_path / 'b.json').write_text(
+            json.dumps({'token': 't2', 'chat_id': 2}))
+        (tmp_path / 'a.json').write_text(
+            json.dumps({'token': 't1', 'chat_id': 1}))
+        (tmp_path / 'notes.txt').write_text('skip me')
+        registry = accounts.load_accounts(str(tmp_path))
+        assert [account.token for account in registry] == ['t1', 't2']
+
+    @pytest.mark.parametrize('data', [
+        [{'token': 't1'}],
+        [{'name': 'x', 'token': 't1', 'chat_id': 1},
+         {'name': 'x', 'token': 't2', 'chat_id': 2}],
+        [],
+        'token',
+    ])
+    def test_invalid_registry(self, tmp_path, data):
+        path = tmp_path / 'accounts.json'
+        path.write_text(json.dumps(data))
+        with pytest.raises(exceptions.AccountsConfigError):
+            accounts.load_accounts(str(path))
+
+    def test_activate_sets_current_account(self):
+        account = accounts.Account('ann', 't1', '1')
+        assert accounts.current_account.get() is None
+        with accounts.activate(account):
+            assert accounts.current_account.get() is account
+        assert accounts.current_account.get() is None
+
+    def test_repr_hides_token(self):
+        assert 'secret' not in repr(accounts.Account('ann', 'secret', '1'))
@@ -0,0 +1,61 @@
+import asyncio
+import time
+
+import accounts
+import aio
+import homework
+
+
+def make_engine(fetch, sent, concurrency=8):
+    return aio.AsyncEngine(
+        fetch=fetch,
+        handle_response=homework.handle_response,
+        handle_error=homework.handle_error,
+        send=lambda name, chat_id, text, updated: sent.append(text),
+        concurrency=concurrency,
+    )
+
+
+class TestAsyncEngine:
+    def test_polls_overlap(self):
+        def slow_fetch(timestamp):
+            time.sleep(0.2)
+            return {
+                'homeworks': [{'homework_name': 'hw', 'status': 'reviewing'}],
+                'current_date': timestamp,
+            }
+
+        sent = []
+        registry = [accounts.Account(f'a{i}', 't', str(i)) for i in range(5)]
+        started = time.monotonic()
+        asyncio.run(make_engine(slow_fetch, sent).run_cycle(registry))
+        assert time.monotonic() - started < 0.6
+        assert len(sent) == 5
+
+    def test_uses_active_account_and_contracts(self):
+        seen = []
+
+        def fetch(timestamp):
+            seen.append(accounts.current_account.get().name)
+            return {
+                'homeworks': [{'homework_name': 'hw', 'status': 'approved'}],
+                'current_date': timestamp,
+            }
+
+        sent = []
+        registry = [accounts.Account('ann', 't', '1')]
+        asyncio.run(make_engine(fetch, sent).run_cycle(registry))
+        assert seen == ['ann']
+        assert sent == [
+            'Изменился статус проверки работы "hw". '
+            + homework.HOMEWORK_VERDICTS['approved']
+        ]
+
+    def test_errors_are_reported(self):
+        def failing_fetch(timestamp):
+            raise homework.exceptions.OrigHTTPError('Статус страницы не 200')
+
+        sent = []
+        registry = [accounts.Account('ann', 't', '1')]
+        asyncio.run(make_engine(failing_fetch, sent).run_cycle(registry))
+        assert sent and 'Статус страницы не 200' in sent[0]
@@ -0,0 +1,85 @@
+import inspect
+
+import pytest
+import requests
+import telegram
+
+import bench
+import homework
+import stubs
+
+
+@pytest.fixture
+def practicum():
+    server = stubs.PracticumStub(seed=1, change_rate=1.0).start()
+    yield server
+    server.stop()
+
+
+class TestPracticumStub:
+    def test_first_poll_returns_everything(self, practicum):
+        answer = requests.get(practicum.url, params={'from_date': 0},
+                              headers={'Authorization': 'OAuth a'},
+                              timeout=1).json()
+        assert len(answer['homeworks']) == 3
+        assert isinstance(answer['current_date'], int)
+
+    def test_later_polls_return_changes(self, practicum):
+        now = [1700000000]
+        practicum.clock = lambda: now[0]
+        url, headers = practicum.url, {'Authorization': 'OAuth a'}
+        requests.get(url, params={'from_date': 0}, headers=headers,
+                     timeout=1)
+        now[0] += 600
+        later = requests.get(url, params={'from_date': now[0] - 300},
+                             headers=headers, timeout=1).json()
+        assert len(later['homeworks']) == 1
+        assert later['homeworks'][0]['date_updated'] == '2023-11-14T22:23:20Z'
+
+    def test_error_rate(self):
+        server = stubs.PracticumStub(error_rate=1.0).start()
+        try:
+            assert requests.get(server.url, timeout=1).status_code == 500
+        finally:
+            server.stop()
+        assert (server.requests, server.errors) == (1, 1)
+
+
+def test_telegram_stub_accepts_bot_api_calls():
+    server = stubs.TelegramStub().start()
+    try:
+        bot = telegram.Bot(token='1234:abcdefg', base_url=server.base_url)
+        message = bot.send_message('42', 'привет')
+    finally:
+        server.stop()
+    assert message.text == 'привет'
+    assert server.messages == [('42', 'привет')]
+
+
+def test_bench_drives_main(monkeypatch):
+    for name in ('ACCOUNTS_PATH', 'TELEGRAM_TOKEN', 'ENDPOINT', 'STATE_PATH',
+                 'OUTBOX_PATH', 'ENGINE', 'SENDER_THREAD', 'RETRY_PERIOD',
+                 'REVIEW_PERIOD', 'IDLE_PERIOD', 'TELEGRAM_RATE',
+                 'TELEGRAM_CHAT_RATE', 'CYCLE_BUDGET', 'METRICS_PORT'):
+        monkeypatch.setattr(homework, name, getattr(homework, name))
+    monkeypatch.setattr(homework, 'main', inspect.unwrap(homework.main))
+    result = bench.run(bench.parse_args(
+        ['--accounts', '5', '--duration', '0.5']))
+    assert result['polls'] >= 5
+    assert result['messages'] >= 5
+    assert result['notify_p99_seconds'] is not None
+    assert telegram.Bot is not None and not hasattr(telegram.Bot, 'func')
+
+
+class TestFootprint:
+    def test_bytes_per_account(self, tmp_path):
+        result = bench.account_footprint(
+            20000, store_path=str(tmp_path / 'state.sqlite3'))
+        assert result['accounts'] == 20000
+        assert 0 < result['state_bytes'] < result['bytes_per_account'] < 1000
+
+    def test_memory_store_is_counted(self, tmp_path):
+        on_disk = bench.account_footprint(
+            5000, store_path=str(tmp_path / 'state.sqlite3'))
+        in_memory = bench.account_footprint(5000)
+        assert in_memory['state_bytes'] > on_disk['state_bytes']
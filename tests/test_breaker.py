@@ -0,0 +1,112 @@
+import pytest
+
+import breaker
+import exceptions
+import homework
+from utils import FakeClock
+
+
+def tripped_breaker(clock):
+    circuit = breaker.CircuitBreaker(
+        'api', failure_rate=0.5, window=4, min_calls=4, open_timeout=60,
+        clock=clock)
+    for success in (True, False, True, False):
+        assert circuit.allow()
+        circuit.record(success)
+    return circuit
+
+
+class TestCircuitBreaker:
+    def test_trips_on_error_rate(self):
+        circuit = tripped_breaker(FakeClock())
+        assert circuit.state == breaker.OPEN
+        assert not circuit.allow()
+        assert circuit.retry_after() == 60
+
+    def test_single_probe_closes_on_success(self):
+        clock = FakeClock()
+        circuit = tripped_breaker(clock)
+        clock.now += 60
+        assert circuit.allow()
+        assert circuit.state == breaker.HALF_OPEN
+        assert not circuit.allow()
+        circuit.record(True)
+        assert circuit.state == breaker.CLOSED
+        assert circuit.allow()
+        assert circuit.transitions == {
+            breaker.OPEN: 1, breaker.HALF_OPEN: 1, breaker.CLOSED: 1}
+
+    def test_failed_probe_reopens(self):
+        clock = FakeClock()
+        circuit = tripped_breaker(clock)
+        clock.now += 60
+        assert circuit.allow()
+        circuit.record(False)
+        assert circuit.state == breaker.OPEN
+        assert circuit.retry_after() == 60
+
+
+class TestGetApiAnswerBreaker:
+    def test_open_circuit_skips_request(self, monkeypatch):
+        monkeypatch.setattr(homework, 'BREAKER', tripped_breaker(FakeClock()))
+
+        def fail_get(*args, **kwargs):
+            raise AssertionError('Запрос не должен отправляться')
+
+        monkeypatch.setattr(homework.requests, 'get', fail_get)
+        with pytest.raises(exceptions.CircuitOpenError):
+            homework.get_api_answer(0)
+
+
+class ThrottledResponse:
+    def __init__(self, status_code, headers):
+        self.status_code = status_code
+        self.headers = headers
+
+
+class TestRetryAfter:
+    def test_parse_retry_after(self):
+        assert homework.parse_retry_after('120') == 120
+        assert homework.parse_retry_after(None) is None
+        assert homework.parse_retry_after('soon') is None
+        assert homework.parse_retry_after(
+            'Wed, 21 Oct 2015 07:28:30 GMT', now=1445412500) == 10
+
+    @pytest.mark.parametrize('value', ['inf', 'nan', '-inf'])
+    def test_non_finite_retry_after_is_rejected(self, value):
+        assert homework.parse_retry_after(value) is None
+
+    def test_retry_after_is_capped(self):
+        assert homework.parse_retry_after('1e9') == homework.BACKOFF_MAX
+
+    def test_throttling_is_not_sent_to_student(self):
+        account = homework.accounts.Account('ann', 't', '1')
+        for seconds in (10, 20):
+            error = exceptions.ApiThrottledError(
+                f'API ответило 429, повтор через {seconds} с', seconds)
+            assert homework.handle_error(account, error) == []
+
+    @pytest.mark.parametrize('status', [429, 503])
+    def test_throttled_answer_holds_breaker(self, monkeypatch, status):
+        clock = FakeClock()
+        circuit = breaker.CircuitBreaker('api', clock=clock)
+        monkeypatch.setattr(homework, 'BREAKER', circuit)
+        monkeypatch.setattr(
+            homework.requests, 'get',
+            lambda *args, **kwargs: ThrottledResponse(
+                status, {'Retry-After': '42'}))
+        with pytest.raises(exceptions.ApiThrottledError) as error:
+            homework.get_api_answer(0)
+        assert error.value.retry_after == 42
+        assert circuit.state == breaker.OPEN
+        assert circuit.retry_after() == 42
+
+    def test_server_error_without_header(self, monkeypatch):
+        monkeypatch.setattr(
+            homework, 'BREAKER', breaker.CircuitBreaker('api'))
+        monkeypatch.setattr(
+            homework.requests, 'get',
+            lambda *args, **kwargs: ThrottledResponse(502, {}))
+        with pytest.raises(exceptions.ApiThrottledError) as error:
+            homework.get_api_answer(0)
+        assert error.value.retry_after is None
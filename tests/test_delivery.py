@@ -0,0 +1,222 @@
+import sqlite3
+import threading
+import time
+
+import pytest
+import telegram
+
+import delivery
+import exceptions
+import homework
+from utils import FakeClock
+
+
+class TestOutbox:
+    def test_messages_of_a_chat_keep_order(self):
+        outbox = delivery.Outbox(coalesce=False)
+        for text in ('a1', 'a2', 'a3'):
+            outbox.put('ann', '1', text)
+        outbox.put('bob', '2', 'b1')
+        sent = []
+        assert outbox.drain(lambda message: sent.append(message.text) or 1) == 4
+        assert [text for text in sent if text.startswith('a')] == [
+            'a1', 'a2', 'a3']
+        assert len(outbox) == 0
+
+    def test_failed_chat_is_retried_with_backoff(self):
+        clock = FakeClock()
+        outbox = delivery.Outbox(backoff_base=5, coalesce=False, clock=clock)
+        outbox.put('ann', '1', 'first')
+        outbox.put('ann', '1', 'second')
+        outbox.put('bob', '2', 'other')
+        sent = []
+
+        def flaky(message):
+            if message.text == 'first' and message.attempts == 0:
+                return False
+            sent.append(message.text)
+            return True
+
+        outbox.drain(flaky)
+        assert sent == ['other']
+        clock.now += 4
+        assert outbox.take() is None
+        clock.now += 1
+        outbox.drain(flaky)
+        assert sent == ['other', 'first', 'second']
+
+    def test_undelivered_messages_survive_restart(self, tmp_path):
+        path = str(tmp_path / 'outbox.sqlite3')
+        outbox = delivery.Outbox(path, coalesce=False)
+        outbox.put('ann', '1', 'sent')
+        outbox.put('ann', '1', 'pending')
+        outbox.flush()
+        message = outbox.take()
+        outbox.complete(message, True)
+        outbox.close()
+
+        restarted = delivery.Outbox(path)
+        assert len(restarted) == 1
+        assert restarted.take().text == 'pending'
+        message = restarted.put('ann', '1', 'new')
+        assert message.id == 3
+
+
+class TestDigests:
+    def test_pending_messages_are_merged(self):
+        outbox = delivery.Outbox()
+        for text in ('a1', 'a2', 'a3'):
+            outbox.put('ann', '1', text)
+        outbox.put('bob', '2', 'b1')
+        sent = []
+        outbox.drain(lambda message: sent.append(message.text) or True)
+        assert sorted(sent) == ['a1\n\na2\n\na3', 'b1']
+        assert len(outbox) == 0
+
+    def test_digest_respects_length_limit(self):
+        outbox = delivery.Outbox(max_length=10)
+        for text in ('aaaa', 'bbbb', 'cccc'):
+            outbox.put('ann', '1', text)
+        sent = []
+        outbox.drain(lambda message: sent.append(message.text) or True)
+        assert sent == ['aaaa\n\nbbbb', 'cccc']
+
+    def test_long_message_is_split(self):
+        outbox = delivery.Outbox(max_length=10)
+        outbox.put('ann', '1', 'line one\nline two\n' + 'x' * 25)
+        sent = []
+        outbox.drain(lambda message: sent.append(message.text) or True)
+        assert all(len(text) <= 10 for text in sent)
+        assert ''.join(sent).replace('\n', '') == (
+            'line oneline two' + 'x' * 25)
+
+    def test_window_holds_first_message(self):
+        clock = FakeClock()
+        outbox = delivery.Outbox(window=30, clock=clock, wall_clock=clock)
+        outbox.put('ann', '1', 'first')
+        assert outbox.take() is None
+        clock.now += 10
+        outbox.put('ann', '1', 'second')
+        clock.now += 20
+        message = outbox.take()
+        assert message.text == 'first\n\nsecond'
+        outbox.complete(message, True)
+        assert len(outbox) == 0
+
+    def test_failed_digest_is_retried_whole(self):
+        outbox = delivery.Outbox(backoff_base=0)
+        outbox.put('ann', '1', 'a1')
+        outbox.put('ann', '1', 'a2')
+        message = outbox.take()
+        outbox.complete(message, False)
+        assert outbox.take().text == 'a1\n\na2'
+
+    def test_rejected_message_is_dropped(self, tmp_path):
+        delivered = []
+        path = str(tmp_path / 'outbox.sqlite3')
+        outbox = delivery.Outbox(path, coalesce=False,
+                                 on_delivered=delivered.append)
+        outbox.put('ann', '1', 'blocked')
+        outbox.put('bob', '2', 'ok')
+        outbox.flush()
+
+        def deliver(message):
+            if message.chat_id == '1':
+                raise exceptions.UndeliverableError('Forbidden')
+            return True
+
+        assert outbox.drain(deliver) == 1
+        assert len(outbox) == 0
+        assert [message.text for message in delivered] == ['ok']
+        outbox.close()
+        assert len(delivery.Outbox(path)) == 0
+
+
+class TestSenderWorker:
+    def test_worker_delivers_in_background(self):
+        outbox = delivery.Outbox()
+        done = threading.Event()
+        sent = []
+
+        def deliver(message):
+            sent.append(message.text)
+            done.set()
+            return True
+
+        worker = delivery.SenderWorker(outbox, deliver, poll_interval=0.05)
+        worker.start()
+        outbox.put('ann', '1', 'hello')
+        assert done.wait(1)
+        worker.stop(1)
+        assert not worker.is_alive()
+        assert sent == ['hello']
+
+    def test_worker_survives_store_errors(self):
+        outbox = delivery.Outbox()
+        done = threading.Event()
+        failures = []
+
+        def flush():
+            failures.append(True)
+            raise sqlite3.OperationalError('disk I/O error')
+
+        outbox.flush = flush
+        worker = delivery.SenderWorker(
+            outbox, lambda message: done.set() or True, poll_interval=0.01)
+        worker.start()
+        while not failures:
+            time.sleep(0.01)
+        outbox.put('ann', '1', 'hello')
+        assert done.wait(1)
+        assert worker.is_alive()
+        worker.stop(1)
+
+    def test_failure_after_delivery_is_not_retried(self):
+        def on_delivered(message):
+            if message.text == 'hello':
+                raise RuntimeError('boom')
+
+        outbox = delivery.Outbox(on_delivered=on_delivered)
+        sent = []
+        done = threading.Event()
+
+        def deliver(message):
+            sent.append(message.text)
+            if message.text == 'next':
+                done.set()
+            return True
+
+        worker = delivery.SenderWorker(outbox, deliver, poll_interval=0.01)
+        worker.start()
+        outbox.put('ann', '1', 'hello')
+        while not sent:
+            time.sleep(0.01)
+        outbox.put('ann', '1', 'next')
+        assert done.wait(1)
+        worker.stop(1)
+        assert sent == ['hello', 'next']
+        assert len(outbox) == 0
+
+
+class RejectingBot:
+    def __init__(self, error):
+        self.error = error
+
+    def send_message(self, chat_id, text, timeout=None):
+        raise self.error
+
+
+class TestSendMessage:
+    @pytest.mark.parametrize('error', [
+        telegram.error.Unauthorized('Forbidden: bot was blocked by the user'),
+        telegram.error.BadRequest('Chat not found'),
+    ])
+    def test_permanent_errors_are_final(self, error):
+        dropped = homework.MESSAGES_DROPPED.values.get((), 0)
+        with pytest.raises(exceptions.UndeliverableError):
+            homework.send_message(RejectingBot(error), 'text')
+        assert homework.MESSAGES_DROPPED.values[()] == dropped + 1
+
+    def test_other_errors_are_retried(self):
+        bot = RejectingBot(telegram.error.NetworkError('timeout'))
+        assert homework.send_message(bot, 'text') is False
@@ -0,0 +1,67 @@
+import json
+import urllib.error
+import urllib.request
+
+import pytest
+
+import health
+import metrics
+from utils import FakeClock
+
+
+def make_monitor(stall_after=60):
+    clock = FakeClock(1000.0)
+    return health.Monitor(stall_after, depth=lambda: 3, clock=clock,
+                          wall_clock=lambda: 1700000000), clock
+
+
+class TestMonitor:
+    def test_sleeping_loop_is_healthy(self):
+        monitor, clock = make_monitor()
+        monitor.wake(300)
+        monitor.sleep(600)
+        clock.now += 600 + 60
+        assert monitor.report()[0]
+
+    def test_stuck_loop_is_reported(self):
+        monitor, clock = make_monitor()
+        monitor.wake(300)
+        clock.now += 300 + 61
+        healthy, report = monitor.report()
+        assert not healthy
+        assert report['status'] == 'stalled'
+        assert report['outbox_depth'] == 3
+
+    def test_lag_against_planned_wakeup(self):
+        monitor, clock = make_monitor()
+        monitor.sleep(600)
+        clock.now += 605
+        monitor.wake(300)
+        assert monitor.lag == 5
+        assert monitor.report()[0]
+
+    def test_last_poll(self):
+        monitor, _ = make_monitor()
+        monitor.polled()
+        assert monitor.report()[1]['last_poll'] == 1700000000
+
+
+@pytest.mark.parametrize('delay, status', [(0, 200), (400, 503)])
+def test_health_endpoint(delay, status):
+    monitor, clock = make_monitor()
+    monitor.wake(300)
+    clock.now += delay
+    server = metrics.serve(metrics.Registry(), 0, host='127.0.0.1',
+                           health=monitor)
+    try:
+        url = f'http://127.0.0.1:{server.server_address[1]}/health'
+        try:
+            with urllib.request.urlopen(url, timeout=1) as response:
+                code, body = response.status, response.read()
+        except urllib.error.HTTPError as error:
+            code, body = error.code, error.read()
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert code == status
+    assert json.loads(body)['outbox_depth'] == 3
@@ -0,0 +1,91 @@
+import sqlite3
+
+import accounts
+import delivery
+import homework
+import latency
+
+
+class TestLatencyTracker:
+    def test_quantiles_overall_and_per_account(self):
+        tracker = latency.LatencyTracker(account_window=50)
+        for seconds in range(1, 101):
+            tracker.record('ann' if seconds % 2 else 'bob', seconds)
+        assert tracker.quantiles() == {0.5: 50, 0.95: 95, 0.99: 99}
+        assert tracker.quantiles('ann')[0.5] == 49
+        assert set(tracker.per_account()) == {'ann', 'bob'}
+
+    def test_windows_are_bounded(self):
+        tracker = latency.LatencyTracker(window=10, account_window=3)
+        for seconds in range(100):
+            tracker.record('ann', seconds)
+        assert tracker.quantiles('ann') == {0.5: 98, 0.95: 99, 0.99: 99}
+        assert tracker.quantiles()[0.5] == 94
+
+    def test_tracked_accounts_are_capped(self):
+        tracker = latency.LatencyTracker(max_accounts=2)
+        tracker.record('ann', 1)
+        tracker.record('bob', 2)
+        tracker.record('ann', 3)
+        tracker.record('eve', 4)
+        assert list(tracker.per_account()) == ['ann', 'eve']
+
+    def test_no_samples(self):
+        assert latency.LatencyTracker().quantiles('ann')[0.99] is None
+
+
+class TestNotifyLatency:
+    def test_updated_taken_from_date_updated(self):
+        account = accounts.Account('ann', 't', '1')
+        account.cursor = 1699990000
+        messages = homework.handle_response(account, {
+            'homeworks': [{'id': 1, 'homework_name': 'hw',
+                           'status': 'approved',
+                           'date_updated': '2023-11-14T22:13:20Z'}],
+            'current_date': 1700000000,
+        })
+        assert messages[0].updated == 1700000000
+
+    def test_missing_or_bad_date(self):
+        assert homework.parse_updated(None) is None
+        assert homework.parse_updated('вчера') is None
+
+    def test_latency_recorded_on_delivery(self):
+        outbox = delivery.Outbox(
+            on_delivered=homework.record_latency,
+            wall_clock=lambda: 1700000000)
+        outbox.put('latency-test', '1', 'text', 1700000000 - 42)
+        outbox.put('latency-test', '1', 'error')
+        before = homework.NOTIFY_SECONDS.samples()
+        outbox.drain(lambda message: True)
+        assert homework.NOTIFY_SECONDS.samples() != before
+        assert homework.LATENCY.quantiles('latency-test')[0.5] >= 42
+        assert len(homework.LATENCY.accounts['latency-test']) == 1
+
+
+class TestOutboxUpdated:
+    def test_updated_survives_restart(self, tmp_path):
+        path = str(tmp_path / 'outbox.sqlite3')
+        outbox = delivery.Outbox(path)
+        outbox.put('ann', '1', 'text', 123.5)
+        outbox.flush()
+        outbox.close()
+        restored = delivery.Outbox(path)
+        assert restored.take().updated == 123.5
+        restored.close()
+
+    def test_old_table_is_migrated(self, tmp_path):
+        path = str(tmp_path / 'outbox.sqlite3')
+        connection = sqlite3.connect(path)
+        connection.execute(
+            'CREATE TABLE outbox (id INTEGER PRIMARY KEY, account TEXT '
+            'NOT NULL, chat_id TEXT NOT NULL, text TEXT NOT NULL, '
+            'created REAL NOT NULL)')
+        connection.execute(
+            "INSERT INTO outbox VALUES (1, 'ann', '1', 'old', 1.0)")
+        connection.commit()
+        connection.close()
+        outbox = delivery.Outbox(path)
+        message = outbox.take()
+        assert (message.text, message.updated) == ('old', None)
+        outbox.close()
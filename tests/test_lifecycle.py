@@ -0,0 +1,143 @@
+import asyncio
+import inspect
+import os
+import signal
+import time
+
+import pytest
+
+import aio
+import exceptions
+import homework
+import lifecycle
+
+
+def send_sigterm():
+    os.kill(os.getpid(), signal.SIGTERM)
+
+
+class TestGracefulExit:
+    def test_signal_interrupts_sleep(self):
+        stopper = lifecycle.GracefulExit()
+        previous = signal.getsignal(signal.SIGTERM)
+        stopper.install()
+        started = time.monotonic()
+        try:
+            with pytest.raises(exceptions.ShutdownRequested):
+                with stopper.interruptible():
+                    send_sigterm()
+                    time.sleep(5)
+        finally:
+            stopper.restore()
+        assert time.monotonic() - started < 1
+        assert stopper.requested
+        assert signal.getsignal(signal.SIGTERM) is previous
+
+    def test_signal_outside_sleep_only_sets_flag(self):
+        stopper = lifecycle.GracefulExit()
+        stopper.install()
+        try:
+            send_sigterm()
+            assert stopper.requested
+            with pytest.raises(exceptions.ShutdownRequested):
+                with stopper.interruptible():
+                    time.sleep(5)
+        finally:
+            stopper.restore()
+
+
+class Bot:
+    sent = []
+
+    def __init__(self, token):
+        pass
+
+    def send_message(self, chat_id, text, timeout=None):
+        Bot.sent.append(text)
+
+
+class Response:
+    status_code = 200
+
+    def json(self):
+        return {'homeworks': [{'id': 1, 'homework_name': 'hw',
+                               'status': 'approved'}],
+                'current_date': 1700000000}
+
+
+def test_main_exits_on_sigterm_and_drains_outbox(monkeypatch):
+    real_sleep = time.sleep
+
+    def sleep(seconds):
+        send_sigterm()
+        real_sleep(seconds)
+
+    Bot.sent = []
+    monkeypatch.setattr(homework, 'PRACTICUM_TOKEN', 't')
+    monkeypatch.setattr(homework, 'TELEGRAM_TOKEN', 't')
+    monkeypatch.setattr(homework, 'TELEGRAM_CHAT_ID', '1')
+    monkeypatch.setattr(homework, 'SENDER_THREAD', True)
+    monkeypatch.setattr(homework.telegram, 'Bot', Bot)
+    monkeypatch.setattr(homework.requests, 'get', lambda **kw: Response())
+    monkeypatch.setattr(time, 'sleep', sleep)
+    started = time.monotonic()
+    inspect.unwrap(homework.main)()
+    assert time.monotonic() - started < 1
+    assert len(Bot.sent) == 1
+    assert 'hw' in Bot.sent[0]
+
+
+def test_cycle_stops_polling_after_signal(monkeypatch):
+    stopper = lifecycle.GracefulExit()
+    plan = homework.scheduler.Scheduler(clock=lambda: 0.0)
+    registry = [homework.accounts.Account(name, 't', name) for name in 'abc']
+    for account in registry:
+        plan.add(account)
+    polled = []
+
+    def fake_poll(outbox, account):
+        polled.append(account.name)
+        stopper.requested = True
+        return False, None
+
+    monkeypatch.setattr(homework, 'poll_account', fake_poll)
+    deadline = homework.scheduler.Deadline(300)
+    homework.run_cycle(plan, None, deadline, stopper)
+    assert polled == ['a']
+    assert plan.due() == registry[1:]
+
+
+def test_async_cycle_stops_polling_after_signal():
+    stopper = lifecycle.GracefulExit()
+    plan = homework.scheduler.Scheduler(clock=lambda: 0.0)
+    registry = [homework.accounts.Account(name, 't', name) for name in 'abc']
+
+    def fetch(timestamp):
+        stopper.requested = True
+        return {'homeworks': [], 'current_date': 1700000000}
+
+    engine = aio.AsyncEngine(
+        fetch=fetch, handle_response=homework.handle_response,
+        handle_error=homework.handle_error, send=None, concurrency=1)
+    asyncio.run(engine.run_cycle(registry, plan, stopper=stopper))
+    assert [account.cursor for account in registry] == [1700000000, 0, 0]
+    assert sorted(plan.due(), key=lambda account: account.name) == (
+        registry[1:])
+
+
+def test_main_shuts_down_on_unexpected_error(monkeypatch):
+    drained = []
+
+    def broken_iteration(*args, **kwargs):
+        raise RuntimeError('boom')
+
+    monkeypatch.setattr(homework, 'PRACTICUM_TOKEN', 't')
+    monkeypatch.setattr(homework, 'TELEGRAM_TOKEN', 't')
+    monkeypatch.setattr(homework, 'TELEGRAM_CHAT_ID', '1')
+    monkeypatch.setattr(homework.telegram, 'Bot', Bot)
+    monkeypatch.setattr(homework, 'run_iteration', broken_iteration)
+    monkeypatch.setattr(homework, 'shutdown',
+                        lambda *args: drained.append(args))
+    with pytest.raises(RuntimeError):
+        inspect.unwrap(homework.main)()
+    assert len(drained) == 1
@@ -0,0 +1,125 @@
+import gzip
+import json
+import logging
+import queue
+
+import accounts
+import homework
+import logs
+
+
+class TestQueueLogging:
+    def test_records_written_by_listener(self, tmp_path):
+        logger = logging.getLogger('test_logs.listener')
+        logger.propagate = False
+        path = tmp_path / 'bot.log'
+        listener = logs.setup_logging(logger, str(path))
+        logger.info('Запись %s', 1)
+        listener.stop()
+        assert 'Запись 1' in path.read_text(encoding='utf-8')
+
+    def test_rotated_files_are_compressed(self, tmp_path):
+        logger = logging.getLogger('test_logs.rotation')
+        logger.propagate = False
+        path = tmp_path / 'bot.log'
+        listener = logs.setup_logging(
+            logger, str(path), max_bytes=200, backup_count=2)
+        for index in range(50):
+            logger.info('Строка номер %d', index)
+        listener.stop()
+        backups = sorted(tmp_path.glob('bot.log.*.gz'))
+        assert [backup.name for backup in backups] == [
+            'bot.log.1.gz', 'bot.log.2.gz']
+        with gzip.open(backups[0], 'rt', encoding='utf-8') as backup:
+            assert 'Строка номер' in backup.read()
+
+    def test_full_queue_drops_records(self):
+        handler = logs.DroppingQueueHandler(queue.Queue(1))
+        record = logging.makeLogRecord({'msg': 'x'})
+        handler.enqueue(record)
+        handler.enqueue(record)
+        assert handler.dropped == 1
+
+
+def record(msg, *args, level=logging.DEBUG):
+    return logging.makeLogRecord(
+        {'msg': msg, 'args': args, 'levelno': level,
+         'levelname': logging.getLevelName(level)})
+
+
+class TestSampling:
+    def test_every_nth_sampled_event_passes(self):
+        sampler = logs.SamplingFilter({'Статус не поменялся': 10})
+        passed = [sampler.filter(record('Статус не поменялся'))
+                  for _ in range(30)]
+        assert passed.count(True) == 3
+        assert all(sampler.filter(record('Другое')) for _ in range(30))
+
+    def test_rate_limit_reports_suppressed(self):
+        now = [0]
+        sampler = logs.SamplingFilter(limit=2, period=60,
+                                      clock=lambda: now[0])
+        passed = [sampler.filter(record('Работ: %d', 1)) for _ in range(5)]
+        assert passed == [True, True, False, False, False]
+        now[0] = 60
+        late = record('Работ: %d', 1)
+        assert sampler.filter(late)
+        assert late.suppressed == 3
+
+    def test_rate_limit_state_is_pruned(self):
+        sampler = logs.SamplingFilter(limit=1, prune_size=10)
+        for index in range(100):
+            sampler.filter(record(f'Шаблон {index}'))
+        assert len(sampler.windows) <= 11
+
+    def test_warnings_are_never_dropped(self):
+        sampler = logs.SamplingFilter({'Сбой': 100}, limit=1)
+        assert all(sampler.filter(record('Сбой', level=logging.ERROR))
+                   for _ in range(10))
+
+    def test_dropped_records_are_not_formatted(self, tmp_path):
+        formatted = []
+
+        class Argument:
+            def __str__(self):
+                formatted.append(1)
+                return 'x'
+
+        logger = logging.getLogger('test_logs.lazy')
+        logger.propagate = False
+        listener = logs.setup_logging(
+            logger, str(tmp_path / 'bot.log'), level=logging.DEBUG,
+            sampler=logs.SamplingFilter({'Значение %s': 100}))
+        for _ in range(100):
+            logger.debug('Значение %s', Argument())
+        listener.stop()
+        assert len(formatted) == 1
+
+
+class TestJsonFormatter:
+    def test_json_line_keeps_event_template(self, tmp_path):
+        logger = logging.getLogger('test_logs.json')
+        logger.propagate = False
+        path = tmp_path / 'bot.log'
+        listener = logs.setup_logging(
+            logger, str(path), formatter=logs.JsonFormatter())
+        logger.warning('Чат %s: %s', '1', 'ошибка')
+        listener.stop()
+        entry = json.loads(path.read_text(encoding='utf-8'))
+        assert entry['event'] == 'Чат %s: %s'
+        assert entry['message'] == 'Чат 1: ошибка'
+        assert entry['level'] == 'WARNING'
+
+
+def test_token_is_not_logged(monkeypatch, caplog):
+    class Response:
+        status_code = 200
+
+        def json(self):
+            return {'homeworks': [], 'current_date': 0}
+
+    monkeypatch.setattr(homework.requests, 'get', lambda **kwargs: Response())
+    caplog.set_level(logging.DEBUG)
+    with accounts.activate(accounts.Account('ann', 'secret-token', '1')):
+        homework.get_api_answer(0)
+    assert 'secret-token' not in caplog.text
@@ -0,0 +1,88 @@
+import urllib.request
+
+import homework
+import metrics
+
+
+class TestRegistry:
+    def test_render_counter_and_histogram(self):
+        registry = metrics.Registry()
+        errors = registry.counter('errors_total', 'Ошибки', ('exception',))
+        errors.inc(exception='OrigHTTPError')
+        errors.inc(2, exception='OrigHTTPError')
+        latency = registry.histogram(
+            'stage_seconds', 'Этапы', ('stage',), buckets=(0.1, 1))
+        latency.observe(0.05, stage='get')
+        latency.observe(0.5, stage='get')
+        registry.gauge('depth', 'Очередь', lambda: 7)
+        text = registry.render()
+        assert 'errors_total{exception="OrigHTTPError"} 3' in text
+        assert 'stage_seconds_bucket{stage="get",le="0.1"} 1' in text
+        assert 'stage_seconds_bucket{stage="get",le="1"} 2' in text
+        assert 'stage_seconds_bucket{stage="get",le="+Inf"} 2' in text
+        assert 'stage_seconds_count{stage="get"} 2' in text
+        assert '# TYPE depth gauge\ndepth 7' in text
+
+    def test_computed_counter_type(self):
+        registry = metrics.Registry()
+        registry.computed_counter('events_total', 'События', lambda: 3)
+        assert '# TYPE events_total counter\nevents_total 3' in (
+            registry.render())
+
+    def test_label_values_are_escaped(self):
+        registry = metrics.Registry()
+        registry.counter('c', 'c', ('name',)).inc(name='a"b')
+        assert 'c{name="a\\"b"} 1' in registry.render()
+
+    def test_http_endpoint(self):
+        registry = metrics.Registry()
+        registry.counter('polls_total', 'Опросы').inc()
+        server = metrics.serve(registry, 0, host='127.0.0.1')
+        try:
+            url = f'http://127.0.0.1:{server.server_address[1]}/metrics'
+            with urllib.request.urlopen(url, timeout=1) as response:
+                assert 'polls_total 1' in response.read().decode()
+        finally:
+            server.shutdown()
+            server.server_close()
+
+
+class TestPipelineMetrics:
+    def test_stages_are_timed(self):
+        def observations():
+            counts = homework.STAGE_SECONDS.values.get(('check_response',))
+            return sum(counts[:-1]) if counts else 0
+
+        before = observations()
+        homework.check_response({'homeworks': []})
+        assert observations() == before + 1
+
+    def test_batch_parse_is_timed_as_parse_status(self):
+        def observations():
+            counts = homework.STAGE_SECONDS.values.get(('parse_status',))
+            return sum(counts[:-1]) if counts else 0
+
+        before = observations()
+        homework.parse_statuses([{'homework_name': 'hw',
+                                  'status': 'approved'}])
+        assert observations() == before + 1
+
+    def test_failed_polls_are_counted(self):
+        account = homework.accounts.Account('ann', 't', '1')
+        before = homework.POLLS.get(result='error')
+        homework.handle_error(
+            account, homework.exceptions.OrigExceptError('timeout'))
+        assert homework.POLLS.get(result='error') == before + 1
+
+    def test_errors_counted_by_class(self):
+        account = homework.accounts.Account('ann', 't', '1')
+        before = homework.ERRORS.get(exception='OrigHTTPError')
+        homework.handle_error(
+            account, homework.exceptions.OrigHTTPError('Статус 500'))
+        assert homework.ERRORS.get(exception='OrigHTTPError') == before + 1
+
+    def test_api_totals_are_counters(self):
+        text = metrics.REGISTRY.render()
+        assert '# TYPE homework_bot_api_bytes_received_total counter' in text
+        assert ('# TYPE homework_bot_api_connections_total counter'
+                in text)
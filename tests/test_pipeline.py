@@ -0,0 +1,192 @@
+import accounts
+import homework
+
+
+def response(homeworks, current_date=1700000000):
+    return {'homeworks': homeworks, 'current_date': current_date}
+
+
+class TestHandleResponse:
+    def test_cursor_advances_to_current_date(self):
+        account = accounts.Account('ann', 't', '1')
+        homework.handle_response(account, response([]))
+        assert account.cursor == 1700000000
+
+    def test_bad_homework_does_not_block_the_rest(self):
+        account = accounts.Account('ann', 't', '1')
+        account.cursor = 1699990000
+        messages = homework.handle_response(account, response([
+            {'id': 2, 'homework_name': 'hw2', 'status': 'unknown'},
+            {'id': 1, 'homework_name': 'hw1', 'status': 'approved'},
+        ]))
+        assert messages[0].text.startswith(
+            'Изменился статус проверки работы "hw1"')
+        assert 'Неизвестный статус работы: unknown' in messages[1].text
+        assert account.statuses == {'1': 'approved'}
+        assert account.cursor == 1700000000
+
+    def test_first_sync_reports_only_newest_homework(self):
+        account = accounts.Account('ann', 't', '1')
+        messages = homework.handle_response(account, response([
+            {'id': index, 'homework_name': f'hw{index}',
+             'status': 'approved', 'date_updated': '2023-01-01T00:00:00Z'}
+            for index in range(15, 0, -1)]))
+        assert [message.text.split('"')[1] for message in messages] == [
+            'hw15']
+        assert messages[0].updated is None
+        assert len(account.statuses) == 15
+        assert homework.handle_response(account, response([
+            {'id': 1, 'homework_name': 'hw1', 'status': 'approved'}])) == []
+
+    def test_non_dict_items_do_not_block_the_rest(self):
+        account = accounts.Account('ann', 't', '1')
+        account.cursor = 1699990000
+        messages = homework.handle_response(account, response([
+            {'id': 1, 'homework_name': 'hw1', 'status': 'approved'},
+            'junk', None]))
+        assert messages[0].text.startswith(
+            'Изменился статус проверки работы "hw1"')
+        assert 'не является словарём' in messages[1].text
+        assert account.statuses == {'1': 'approved'}
+        assert account.cursor == 1700000000
+
+    def test_empty_poll_sends_nothing(self):
+        account = accounts.Account('ann', 't', '1')
+        assert homework.handle_response(account, response([])) == []
+
+
+class TestStatusIndex:
+    def test_known_status_is_not_sent_again(self):
+        account = accounts.Account('ann', 't', '1')
+        answer = response([{'id': 1, 'homework_name': 'hw',
+                            'status': 'approved'}])
+        assert homework.handle_response(account, answer)
+        assert homework.handle_response(account, answer) == []
+        assert account.pending == [('1', 'approved')]
+
+    def test_statuses_restored_after_restart(self, tmp_path):
+        store = homework.state.open_store(str(tmp_path / 'state.sqlite3'))
+        account = accounts.Account('ann', 't', '1')
+        answer = response([{'id': 1, 'homework_name': 'hw',
+                            'status': 'approved'}])
+        homework.handle_response(account, answer)
+        homework.save_state(store, [account])
+        store.close()
+
+        restarted = accounts.Account('ann', 't', '1')
+        store = homework.state.open_store(str(tmp_path / 'state.sqlite3'))
+        homework.load_state(store, [restarted])
+        assert restarted.cursor == 1700000000
+        assert homework.handle_response(restarted, answer) == []
+
+
+class TestDiffHomeworks:
+    def test_every_change_is_reported_oldest_first(self):
+        account = accounts.Account('ann', 't', '1')
+        account.statuses = {'1': 'reviewing', '2': 'approved'}
+        messages = homework.handle_response(account, response([
+            {'id': 3, 'homework_name': 'hw3', 'status': 'reviewing'},
+            {'id': 2, 'homework_name': 'hw2', 'status': 'approved'},
+            {'id': 1, 'homework_name': 'hw1', 'status': 'rejected'},
+        ]))
+        assert [message.text.split('"')[1] for message in messages] == [
+            'hw1', 'hw3']
+        assert account.statuses == {
+            '1': 'rejected', '2': 'approved', '3': 'reviewing'}
+
+    def test_repeated_homework_uses_newest_entry(self):
+        changed, errors = homework.diff_homeworks({}, [
+            {'id': 1, 'homework_name': 'hw', 'status': 'approved'},
+            {'id': 1, 'homework_name': 'hw', 'status': 'reviewing'},
+        ])
+        assert [item['status'] for _, item in changed] == ['approved']
+        assert errors == []
+
+    def test_statuses_are_interned(self):
+        account = accounts.Account('ann', 't', '1')
+        homework.handle_response(account, response([
+            {'id': 1, 'homework_name': 'hw', 'status': ''.join('approved')},
+        ]))
+        assert account.statuses['1'] is homework.STATUS_CODES['approved']
+
+
+class TestParseStatuses:
+    def test_batch_matches_parse_status(self):
+        homeworks = [
+            {'homework_name': f'hw{index}', 'status': status}
+            for index, status in enumerate(homework.HOMEWORK_VERDICTS)
+        ]
+        messages, errors = homework.parse_statuses(homeworks)
+        assert errors == []
+        assert messages == [homework.parse_status(item) for item in homeworks]
+
+    def test_errors_are_collected_per_item(self):
+        homeworks = [
+            {'homework_name': 'hw1', 'status': 'approved'},
+            {'status': 'approved'},
+            {'homework_name': 'hw3'},
+            {'homework_name': 'hw4', 'status': 'unknown'},
+            'hw5',
+        ]
+        messages, errors = homework.parse_statuses(homeworks)
+        assert messages[0] is not None
+        assert messages[1:] == [None] * 4
+        assert [error.index for error in errors] == [1, 2, 3, 4]
+        assert 'homework_name' in errors[0].reason
+
+
+class TestCycleBudget:
+    def test_request_has_timeouts(self, monkeypatch):
+        calls = []
+
+        def fake_get(url, **kwargs):
+            calls.append(kwargs)
+            raise homework.RequestException('stop')
+
+        monkeypatch.setattr(homework.requests, 'get', fake_get)
+        try:
+            homework.get_api_answer(0)
+        except homework.exceptions.OrigExceptError:
+            pass
+        assert calls[0]['timeout'] == (
+            homework.CONNECT_TIMEOUT, homework.READ_TIMEOUT)
+
+    def test_overrun_postpones_remaining_accounts(self, monkeypatch):
+        clock = [0.0]
+        plan = homework.scheduler.Scheduler(clock=lambda: clock[0])
+        registry = [accounts.Account(name, 't', name) for name in 'abc']
+        for account in registry:
+            plan.add(account)
+        polled = []
+
+        def fake_poll(outbox, account):
+            polled.append(account.name)
+            clock[0] += 6
+            return False, None
+
+        monkeypatch.setattr(homework, 'poll_account', fake_poll)
+        overruns = homework.STATS['cycle_overruns']
+        deadline = homework.scheduler.Deadline(10, clock=lambda: clock[0])
+        homework.run_cycle(plan, None, deadline)
+        assert polled == ['a', 'b']
+        assert homework.STATS['cycle_overruns'] == overruns + 1
+        assert plan.due() == [registry[2]]
+
+    def test_inline_send_stops_at_deadline(self, monkeypatch):
+        clock = [0.0]
+        monkeypatch.setattr(homework, 'SENDER_THREAD', False)
+        outbox = homework.delivery.Outbox(coalesce=False)
+        for chat_id in '123':
+            outbox.put('ann', chat_id, 'text')
+        sent = []
+
+        def deliver(message):
+            sent.append(message.chat_id)
+            clock[0] += 6
+            return True
+
+        deadline = homework.scheduler.Deadline(10, clock=lambda: clock[0])
+        homework.finish_cycle(homework.state.open_store(''), [], outbox,
+                              deliver, deadline)
+        assert sent == ['1', '2']
+        assert len(outbox) == 1
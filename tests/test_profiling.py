@@ -0,0 +1,71 @@
+import os
+import signal
+import tracemalloc
+
+import profiling
+
+
+def run_cycles(profiler, count):
+    for _ in range(count):
+        if profiler.enabled:
+            profiler.cycle_started()
+        sorted(range(1000), key=lambda item: -item)
+        if profiler.enabled:
+            profiler.cycle_finished()
+
+
+class TestProfiler:
+    def test_disabled_by_default(self, tmp_path):
+        profiler = profiling.Profiler(str(tmp_path / 'out'), cycles=2)
+        run_cycles(profiler, 5)
+        assert not profiler.enabled
+        assert not (tmp_path / 'out').exists()
+
+    def test_cpu_profile_for_n_cycles(self, tmp_path):
+        profiler = profiling.Profiler(str(tmp_path), cycles=2)
+        profiler.request(profiling.CPU)
+        run_cycles(profiler, 1)
+        assert list(tmp_path.iterdir()) == []
+        run_cycles(profiler, 1)
+        assert sorted(path.suffix for path in tmp_path.iterdir()) == [
+            '.prof', '.txt']
+        assert not profiler.enabled
+        report = next(tmp_path.glob('*.txt')).read_text(encoding='utf-8')
+        assert 'sorted' in report
+
+    def test_memory_snapshot_diff(self, tmp_path):
+        profiler = profiling.Profiler(str(tmp_path), cycles=1,
+                                      mode=profiling.MEMORY)
+        kept = []
+        profiler.cycle_started()
+        kept.append(bytearray(1 << 20))
+        profiler.cycle_finished()
+        assert sorted(path.suffix for path in tmp_path.iterdir()) == [
+            '.tracemalloc', '.txt']
+        report = next(tmp_path.glob('*.txt')).read_text(encoding='utf-8')
+        assert 'test_profiling.py' in report.splitlines()[0]
+
+    def test_unwritable_directory_does_not_raise(self, tmp_path):
+        blocker = tmp_path / 'file'
+        blocker.write_text('')
+        profiler = profiling.Profiler(str(blocker / 'out'), cycles=1,
+                                      mode=profiling.CPU)
+        run_cycles(profiler, 1)
+        assert not profiler.enabled
+        assert profiler.mode is None and profiler.profile is None
+        profiler.request(profiling.MEMORY)
+        run_cycles(profiler, 1)
+        assert not tracemalloc.is_tracing()
+
+    def test_signal_requests_profile(self, tmp_path):
+        profiler = profiling.Profiler(str(tmp_path), cycles=1)
+        previous = signal.getsignal(signal.SIGUSR1)
+        profiler.install()
+        try:
+            os.kill(os.getpid(), signal.SIGUSR1)
+        finally:
+            profiler.restore()
+        assert profiler.requested == profiling.CPU
+        assert signal.getsignal(signal.SIGUSR1) is previous
+        run_cycles(profiler, 1)
+        assert any(tmp_path.glob('cpu-*.prof'))
@@ -0,0 +1,74 @@
+import delivery
+import exceptions
+import ratelimit
+from utils import FakeClock
+
+
+class TestSendLimiter:
+    def test_global_rate(self):
+        clock = FakeClock()
+        limiter = ratelimit.SendLimiter(global_rate=2, clock=clock)
+        for chat_id in ('1', '2'):
+            assert limiter.global_wait() == 0
+            limiter.consume(chat_id)
+        assert limiter.global_wait() == 0.5
+        clock.now += 0.5
+        assert limiter.global_wait() == 0
+
+    def test_chat_rate(self):
+        clock = FakeClock()
+        limiter = ratelimit.SendLimiter(chat_rate=1, clock=clock)
+        limiter.consume('1')
+        assert limiter.chat_wait('1') == 1
+        assert limiter.chat_wait('2') == 0
+        limiter.block_chat('1', 30)
+        assert limiter.chat_wait('1') == 30
+
+
+class TestLimitedOutbox:
+    def make_outbox(self, **kwargs):
+        clock = FakeClock()
+        limiter = ratelimit.SendLimiter(clock=clock, **kwargs)
+        outbox = delivery.Outbox(limiter=limiter, coalesce=False, clock=clock)
+        return outbox, clock
+
+    def test_fan_out_stops_at_global_limit(self):
+        outbox, clock = self.make_outbox(global_rate=3)
+        for chat_id in range(5):
+            outbox.put('a', str(chat_id), 'text')
+        assert outbox.drain(lambda message: True) == 3
+        clock.now += 1
+        assert outbox.drain(lambda message: True) == 2
+
+    def test_chat_order_with_chat_limit(self):
+        outbox, clock = self.make_outbox(chat_rate=1)
+        for text in ('1', '2', '3'):
+            outbox.put('a', 'chat', text)
+        sent = []
+
+        def deliver(message):
+            sent.append(message.text)
+            return True
+
+        for _ in range(3):
+            outbox.drain(deliver)
+            clock.now += 1
+        assert sent == ['1', '2', '3']
+
+    def test_retry_after_is_honored(self):
+        outbox, clock = self.make_outbox()
+        outbox.put('a', 'chat', 'hello')
+        calls = []
+
+        def flood(message):
+            calls.append(clock.now)
+            if len(calls) == 1:
+                raise exceptions.FloodControlError(7)
+            return True
+
+        assert outbox.drain(flood) == 0
+        clock.now += 6.9
+        assert outbox.drain(flood) == 0
+        clock.now += 0.1
+        assert outbox.drain(flood) == 1
+        assert calls == [100.0, 107.0]
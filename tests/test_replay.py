@@ -0,0 +1,144 @@
+import gzip
+import os
+import threading
+
+import pytest
+import requests
+
+import accounts
+import exceptions
+import homework
+import replay
+import stubs
+import transport
+
+TOKEN = 'y0_secret-oauth-token'
+
+
+def record(account, t, status=200, body=None, elapsed=0.5, headers=None):
+    if body is None:
+        body = ('{"homeworks": [{"id": 1, "homework_name": "hw", '
+                '"status": "approved"}], "current_date": 1700000000}')
+    return {'t': t, 'elapsed': elapsed, 'account': account,
+            'from_date': 0, 'status': status, 'headers': headers or {},
+            'body': body}
+
+
+@pytest.fixture
+def recording(tmp_path):
+    server = stubs.PracticumStub(seed=1).start()
+    path = str(tmp_path / 'api.jsonl.gz')
+    recorder = transport.RecordingTransport(requests, path)
+    try:
+        for name in ('ann', 'bob'):
+            with accounts.activate(accounts.Account(name, TOKEN, '1')):
+                recorder.get(url=server.url, headers={
+                    'Authorization': f'OAuth {TOKEN}'},
+                    params={'from_date': 0}, timeout=1)
+    finally:
+        recorder.close()
+        server.stop()
+    return path
+
+
+class TestRecording:
+    def test_responses_are_recorded_without_tokens(self, recording):
+        with gzip.open(recording, 'rt', encoding='utf-8') as file:
+            assert TOKEN not in file.read()
+        records = transport.load_records(recording)
+        assert [item['account'] for item in records] == ['ann', 'bob']
+        assert records[0]['status'] == 200
+        assert records[0]['elapsed'] >= 0
+        assert 'homeworks' in records[0]['body']
+
+    def test_replayed_through_get_api_answer(self, recording, monkeypatch):
+        monkeypatch.setattr(homework, 'SESSION',
+                            transport.ReplayTransport(recording, speed=0))
+        with accounts.activate(accounts.Account('bob', 't', '1')):
+            assert len(homework.get_api_answer(0)['homeworks']) == 3
+            with pytest.raises(exceptions.ReplayExhausted):
+                homework.get_api_answer(0)
+
+
+class FakeResponse:
+    status_code = 200
+    headers = {}
+    text = '{}'
+
+
+class FakeInner:
+    def get(self, **kwargs):
+        return FakeResponse()
+
+
+class TestRecordingDurability:
+    def test_truncated_tail_keeps_earlier_batches(self, tmp_path):
+        path = str(tmp_path / 'api.jsonl.gz')
+        recorder = transport.RecordingTransport(FakeInner(), path,
+                                                flush_every=2)
+        for _ in range(4):
+            recorder.get('url')
+        complete = os.path.getsize(path)
+        for _ in range(2):
+            recorder.get('url')
+        with open(path, 'r+b') as file:
+            file.truncate(complete + 12)
+        assert len(transport.load_records(path)) == 4
+
+    def test_concurrent_writes(self, tmp_path):
+        path = str(tmp_path / 'api.jsonl.gz')
+        recorder = transport.RecordingTransport(FakeInner(), path,
+                                                flush_every=7)
+
+        def record_many():
+            for _ in range(100):
+                recorder.get('url')
+
+        threads = [threading.Thread(target=record_many) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        recorder.close()
+        assert len(transport.load_records(path)) == 800
+
+
+class TestReplayTransport:
+    def test_speed_scales_recorded_latency(self):
+        pauses = []
+        replayer = transport.ReplayTransport(
+            [record('ann', 1.0, elapsed=0.8)], speed=4, sleep=pauses.append)
+        with accounts.activate(accounts.Account('ann', 't', '1')):
+            response = replayer.get('url')
+        assert pauses == [0.2]
+        assert response.json()['current_date'] == 1700000000
+
+    def test_throttled_response_keeps_retry_after(self):
+        response = transport.ReplayedResponse(
+            record('ann', 1.0, status=503, body='',
+                   headers={'Retry-After': '30'}))
+        with pytest.raises(exceptions.ApiThrottledError) as error:
+            homework.read_api_answer(response)
+        assert error.value.retry_after == 30
+
+
+class TestReplay:
+    def test_pipeline_runs_on_recorded_answers(self):
+        result = replay.replay([
+            record('ann', 1.0), record('bob', 2.0), record('ann', 3.0),
+            record('bob', 4.0, status=500, body=''),
+        ])
+        assert (result['responses'], result['accounts']) == (4, 2)
+        assert result['messages'] == 2
+
+    def test_recorded_pacing_is_accelerated(self):
+        now = [0.0]
+        pauses = []
+
+        def sleep(seconds):
+            pauses.append(seconds)
+            now[0] += seconds
+
+        replay.replay([record('ann', 10.0), record('ann', 30.0)],
+                      speed=10, sleep=sleep, clock=lambda: now[0])
+        assert pauses == [0, 2.0]
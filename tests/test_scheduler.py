@@ -0,0 +1,87 @@
+import random
+
+import pytest
+
+import accounts
+import exceptions
+import scheduler
+from utils import FakeClock
+
+
+def make_plan(**kwargs):
+    clock = FakeClock(1000.0)
+    plan = scheduler.Scheduler(clock=clock, rng=random.Random(0), **kwargs)
+    return plan, clock
+
+
+class TestScheduler:
+    def test_new_accounts_are_due_immediately(self):
+        plan, clock = make_plan()
+        account = accounts.Account('ann', 't', '1')
+        plan.add(account)
+        assert plan.due() == [account]
+        assert plan.due() == []
+
+    def test_regular_interval(self):
+        plan, clock = make_plan()
+        account = accounts.Account('ann', 't', '1')
+        assert plan.report(account, changed=True) == 600
+        assert plan.delay() == 600
+
+    def test_reviewing_shortens_interval(self):
+        plan, clock = make_plan(review_period=120)
+        account = accounts.Account('ann', 't', '1')
+        account.statuses['1'] = 'reviewing'
+        assert plan.report(account, changed=True) == 120
+
+    def test_errors_back_off_with_jitter(self):
+        plan, clock = make_plan(backoff_base=30, backoff_max=200, jitter=0.1)
+        account = accounts.Account('ann', 't', '1')
+        error = exceptions.OrigHTTPError('Статус страницы не равен 200')
+        intervals = [plan.report(account, error=error) for _ in range(5)]
+        for interval, expected in zip(intervals, [30, 60, 120, 200, 200]):
+            assert expected * 0.9 <= interval <= expected * 1.1
+        assert plan.report(account, changed=True) == 600
+
+    def test_other_errors_keep_regular_interval(self):
+        plan, clock = make_plan()
+        account = accounts.Account('ann', 't', '1')
+        assert plan.report(account, error=ValueError('status')) == 600
+
+    def test_idle_accounts_are_polled_less_often(self):
+        plan, clock = make_plan(idle_after=3, idle_period=1800)
+        account = accounts.Account('ann', 't', '1')
+        intervals = [plan.report(account) for _ in range(4)]
+        assert intervals == [600, 600, 1800, 1800]
+        assert plan.report(account, changed=True) == 600
+
+    def test_due_respects_clock(self):
+        plan, clock = make_plan()
+        first = accounts.Account('ann', 't', '1')
+        second = accounts.Account('bob', 't', '2')
+        plan.add(first, clock.now + 10)
+        plan.add(second, clock.now + 5)
+        assert plan.due() == []
+        clock.now += 5
+        assert plan.due() == [second]
+        assert plan.delay() == 5
+
+
+class TestDeadline:
+    def test_check_raises_after_budget(self):
+        clock = FakeClock(1000.0)
+        deadline = scheduler.Deadline(10, clock=clock)
+        deadline.check('опрос API')
+        clock.now += 10
+        with pytest.raises(exceptions.DeadlineExceeded):
+            deadline.check('опрос API')
+
+
+class TestRetryAfter:
+    def test_advertised_time_is_used_exactly(self):
+        plan, clock = make_plan()
+        account = accounts.Account('ann', 't', '1')
+        error = exceptions.ApiThrottledError('API ответило 429', 42)
+        assert plan.report(account, error=error) == 42
+        assert plan.report(
+            account, error=exceptions.CircuitOpenError(17)) == 17
@@ -0,0 +1,56 @@
+import json
+import time
+
+import homework
+import simulation
+
+
+class TestSimulation:
+    def test_week_runs_fast_and_notifies_changes(self):
+        sim = simulation.Simulation(accounts_count=5, seed=1)
+        started = time.monotonic()
+        result = sim.run(7 * 86400)
+        assert time.monotonic() - started < 5
+        assert result['cycles'] > 1000
+        assert result['status_changes'] > 0
+        assert result['messages'] > 0
+        assert result['notify_p99_seconds'] <= 3600
+
+    def test_same_seed_same_trace(self):
+        first = simulation.Simulation(accounts_count=3, seed=7)
+        second = simulation.Simulation(accounts_count=3, seed=7)
+        assert first.run(86400) == second.run(86400)
+        assert first.trace == second.trace
+
+    def test_policy_trades_api_calls_for_latency(self):
+        eager = simulation.Simulation(accounts_count=5, seed=2).run(86400)
+        lazy = simulation.Simulation(
+            accounts_count=5, seed=2,
+            policy={'period': 1800, 'review_period': 1800}).run(86400)
+        assert lazy['api_calls'] < eager['api_calls']
+        assert lazy['notify_p50_seconds'] > eager['notify_p50_seconds']
+
+    def test_outage_honours_retry_after(self):
+        sim = simulation.Simulation(
+            accounts_count=5, seed=3, outages=[(3600, 7200)])
+        sim.run(4 * 3600)
+        during = [event for event in sim.trace if event.kind == 'poll'
+                  and 3600 <= event.time < 7200]
+        assert during and all(event.detail == 503 for event in during)
+        assert len(during) <= 5
+        assert any(event.kind == 'poll' and event.time >= 7200
+                   and event.detail == 200 for event in sim.trace)
+
+    def test_module_state_is_restored(self):
+        session, breaker = homework.SESSION, homework.BREAKER
+        simulation.Simulation(accounts_count=1).run(3600)
+        assert (homework.SESSION, homework.BREAKER) == (session, breaker)
+
+    def test_trace_written_as_json_lines(self, tmp_path):
+        sim = simulation.Simulation(accounts_count=1)
+        sim.run(3600)
+        path = tmp_path / 'trace.jsonl'
+        sim.write_trace(str(path))
+        lines = path.read_text(encoding='utf-8').splitlines()
+        assert len(lines) == len(sim.trace)
+        assert json.loads(lines[0])['kind'] == 'poll'
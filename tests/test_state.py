@@ -0,0 +1,72 @@
+import pytest
+
+import state
+
+
+@pytest.fixture(params=['state.sqlite3', 'state.jsonl'])
+def store_path(request, tmp_path):
+    return str(tmp_path / request.param)
+
+
+class TestStateStore:
+    def test_state_survives_restart(self, store_path):
+        store = state.open_store(store_path)
+        store.set_cursor('ann', 1700000000)
+        store.set_status('ann', '42', 'reviewing')
+        store.set_status('ann', '42', 'approved')
+        store.close()
+        store = state.open_store(store_path)
+        assert store.get_cursor('ann') == 1700000000
+        assert store.get_statuses('ann') == {'42': 'approved'}
+        assert store.get_statuses('bob') == {}
+        store.close()
+
+    def test_changes_are_written_only_on_flush(self, store_path):
+        store = state.open_store(store_path)
+        store.set_cursor('ann', 5)
+        assert state.open_store(store_path).get_cursor('ann') == 0
+        store.flush()
+        assert state.open_store(store_path).get_cursor('ann') == 5
+
+    def test_state_is_not_mirrored_in_memory(self, store_path):
+        store = state.open_store(store_path)
+        store.set_cursor('ann', 5)
+        store.set_status('ann', '42', 'approved')
+        store.flush()
+        assert (store.cursors, store.statuses) == ({}, {})
+        assert store.get_cursor('ann') == 5
+        assert store.get_statuses('ann') == {'42': 'approved'}
+        store.close()
+
+    def test_in_memory_store(self, tmp_path):
+        store = state.open_store('')
+        store.set_cursor('ann', 5)
+        store.flush()
+        assert store.get_cursor('ann') == 5
+        assert list(tmp_path.iterdir()) == []
+
+
+class TestJournalStore:
+    def test_torn_tail_is_dropped(self, tmp_path):
+        path = tmp_path / 'state.jsonl'
+        store = state.JournalStore(str(path))
+        store.set_cursor('ann', 7)
+        store.flush()
+        with open(path, 'a', encoding='utf-8') as journal:
+            journal.write('{"a": "ann", "c": 9')
+        recovered = state.JournalStore(str(path))
+        assert recovered.get_cursor('ann') == 7
+        recovered.set_cursor('bob', 5)
+        recovered.flush()
+        reopened = state.JournalStore(str(path))
+        assert reopened.get_cursor('ann') == 7
+        assert reopened.get_cursor('bob') == 5
+
+    def test_journal_is_compacted(self, tmp_path):
+        path = tmp_path / 'state.jsonl'
+        store = state.JournalStore(str(path), compact_ratio=2)
+        for cursor in range(1, 20):
+            store.set_cursor('ann', cursor)
+            store.flush()
+        assert len(path.read_text().splitlines()) <= 3
+        assert state.JournalStore(str(path)).get_cursor('ann') == 19
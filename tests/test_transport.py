@@ -0,0 +1,102 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import transport
+
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    body = b'{"homeworks": [], "current_date": 0}'
+
+    def do_GET(self):
+        body = self.body
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class ThrottledHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    hits = 0
+
+    def do_GET(self):
+        type(self).hits += 1
+        self.send_response(429)
+        self.send_header('Retry-After', '2')
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+def serve(handler):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+@pytest.fixture
+def server_url():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), KeepAliveHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{server.server_address[1]}/'
+    server.shutdown()
+    server.server_close()
+
+
+class TestPooledSession:
+    def test_connections_are_reused(self, server_url):
+        session = transport.PooledSession(pool_size=2)
+        for _ in range(5):
+            assert session.get(server_url, timeout=1).json()['homeworks'] == []
+        stats = session.stats()
+        assert (stats['opened'], stats['reused'], stats['requests']) == (
+            1, 4, 5)
+        assert stats['bytes'] == 5 * len(KeepAliveHandler.body)
+        session.close()
+
+    def test_pool_can_be_disabled(self):
+        assert transport.create_session(0) is None
+        assert isinstance(transport.create_session(3), transport.PooledSession)
+
+    def test_throttling_is_not_retried(self, monkeypatch):
+        server = serve(ThrottledHandler)
+        sleeps = []
+        monkeypatch.setattr(time, 'sleep', sleeps.append)
+        session = transport.PooledSession(pool_size=2, retries=2)
+        try:
+            response = session.get(
+                f'http://127.0.0.1:{server.server_address[1]}/', timeout=1)
+        finally:
+            session.close()
+            server.shutdown()
+            server.server_close()
+        assert response.status_code == 429
+        assert ThrottledHandler.hits == 1
+        assert sleeps == []
+
+    def test_excess_requests_wait_for_a_connection(self, server_url):
+        session = transport.PooledSession(pool_size=2)
+        threads = [
+            threading.Thread(target=session.get, args=(server_url,),
+                             kwargs={'timeout': 1})
+            for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        stats = session.stats()
+        assert stats['requests'] == 8
+        assert stats['opened'] <= 2
+        session.close()
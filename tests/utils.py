@@ -165,3 +165,13 @@ def with_timeout(f):
             )
 
     return inner
+
+
+class FakeClock:
+    """Часы для тестов: время меняется только присваиванием now."""
+
+    def __init__(self, now=100.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
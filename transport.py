@@ -0,0 +1,232 @@
+import collections
+import gzip
+import json
+import logging
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+import accounts
+import exceptions
+
+
+class PooledSession:
+    """HTTP-сессия с пулом keep-alive соединений и повторами запросов.
+
+    Повторяются только сбои соединения: ответы 429/503 с Retry-After
+    возвращаются сразу, ожидание повтора — дело расписания опроса.
+    Если запросов одновременно больше pool_size, лишние ждут свободного
+    соединения, а не открывают одноразовые.
+    """
+
+    def __init__(self, pool_size=10, retries=2, backoff_factor=0.5):
+        """Создать сессию с пулом соединений и повторами."""
+        self.session = requests.Session()
+        self.adapter = HTTPAdapter(
+            pool_connections=pool_size,
+            pool_maxsize=pool_size,
+            pool_block=True,
+            max_retries=Retry(
+                total=retries,
+                backoff_factor=backoff_factor,
+                status=0,
+                allowed_methods=frozenset(['GET']),
+                respect_retry_after_header=False,
+                raise_on_status=False,
+            ),
+        )
+        self.session.mount('https://', self.adapter)
+        self.session.mount('http://', self.adapter)
+        self.bytes_received = 0
+
+    def get(self, url, **kwargs):
+        """Выполнить GET-запрос через общий пул соединений."""
+        response = self.session.get(url, **kwargs)
+        size = len(response.content)
+        self.bytes_received += size
+        logging.debug('Ответ %d от %s: %d байт', response.status_code, url,
+                      size)
+        return response
+
+    def stats(self):
+        """Вернуть число открытых и повторно использованных соединений."""
+        pools = self.adapter.poolmanager.pools
+        opened = requests_made = 0
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            opened += pool.num_connections
+            requests_made += pool.num_requests
+        return {
+            'opened': opened,
+            'reused': max(requests_made - opened, 0),
+            'requests': requests_made,
+            'bytes': self.bytes_received,
+        }
+
+    def close(self):
+        """Закрыть все соединения пула."""
+        self.session.close()
+
+
+def create_session(pool_size, retries=2):
+    """Создать пул соединений или None, если пул отключён."""
+    if pool_size <= 0:
+        return None
+    return PooledSession(pool_size=pool_size, retries=retries)
+
+
+SKIPPED_HEADERS = frozenset(['set-cookie'])
+
+
+def account_name():
+    """Имя активного аккаунта или default."""
+    account = accounts.current_account.get()
+    return 'default' if account is None else account.name
+
+
+class RecordingTransport:
+    """Обёртка над транспортом, записывающая ответы API в журнал.
+
+    inner — PooledSession или модуль requests. Записи копятся в памяти
+    и каждые flush_every штук дописываются в журнал отдельным
+    gzip-блоком, поэтому при аварийной остановке читаются все блоки,
+    кроме последнего. get() можно вызывать из нескольких потоков.
+    """
+
+    def __init__(self, inner, path, flush_every=100,
+                 clock=time.perf_counter, wall_clock=time.time):
+        """Создать транспорт, записывающий ответы в path."""
+        self.inner = inner
+        self.path = path
+        self.flush_every = flush_every
+        self.clock = clock
+        self.wall_clock = wall_clock
+        self.lock = threading.Lock()
+        self.lines = []
+
+    def get(self, url, headers=None, params=None, timeout=None):
+        """Выполнить запрос через inner и записать ответ."""
+        started = self.wall_clock()
+        began = self.clock()
+        response = self.inner.get(url=url, headers=headers, params=params,
+                                  timeout=timeout)
+        elapsed = self.clock() - began
+        line = json.dumps({
+            't': started,
+            'elapsed': round(elapsed, 6),
+            'account': account_name(),
+            'from_date': (params or {}).get('from_date'),
+            'status': response.status_code,
+            'headers': {key: value for key, value in response.headers.items()
+                        if key.lower() not in SKIPPED_HEADERS},
+            'body': response.text,
+        }, ensure_ascii=False)
+        with self.lock:
+            self.lines.append(line)
+            if len(self.lines) >= self.flush_every:
+                self._write()
+        return response
+
+    def _write(self):
+        """Дописать накопленные записи gzip-блоком; вызывается под lock."""
+        if not self.lines:
+            return
+        with gzip.open(self.path, 'at', encoding='utf-8') as file:
+            file.write('\n'.join(self.lines) + '\n')
+        self.lines = []
+
+    def flush(self):
+        """Сбросить накопленные записи на диск."""
+        with self.lock:
+            self._write()
+
+    def stats(self):
+        """Счётчики соединений обёрнутого транспорта."""
+        if hasattr(self.inner, 'stats'):
+            return self.inner.stats()
+        return {'opened': 0, 'reused': 0, 'requests': 0, 'bytes': 0}
+
+    def close(self):
+        """Записать остаток журнала и закрыть обёрнутый транспорт."""
+        self.flush()
+        if hasattr(self.inner, 'close'):
+            self.inner.close()
+
+
+def load_records(path):
+    """Прочитать записи журнала в порядке времени запросов.
+
+    Недописанный при аварийной остановке последний блок пропускается.
+    """
+    records = []
+    with gzip.open(path, 'rt', encoding='utf-8') as file:
+        try:
+            for line in file:
+                if line.endswith('\n'):
+                    records.append(json.loads(line))
+        except (EOFError, gzip.BadGzipFile):
+            logging.warning('Журнал %s обрывается, прочитано записей: %d',
+                            path, len(records))
+    records.sort(key=lambda record: record['t'])
+    return records
+
+
+class ReplayedResponse:
+    """Записанный ответ в интерфейсе requests.Response."""
+
+    def __init__(self, record):
+        """Восстановить ответ из записи."""
+        self.status_code = record['status']
+        self.headers = record['headers']
+        self.text = record['body']
+
+    def json(self):
+        """Тело ответа, разобранное из JSON."""
+        return json.loads(self.text)
+
+
+class ReplayTransport:
+    """Транспорт, отдающий записанные ответы вместо запросов к API.
+
+    Ответы выдаются по очереди для каждого аккаунта. speed задаёт
+    ускорение: запрос длится записанное время, делённое на speed;
+    при speed=0 ответы отдаются сразу.
+    """
+
+    def __init__(self, records, speed=1.0, sleep=time.sleep):
+        """Разложить записи по очередям аккаунтов."""
+        if isinstance(records, str):
+            records = load_records(records)
+        self.queues = collections.defaultdict(collections.deque)
+        for record in records:
+            self.queues[record['account']].append(record)
+        self.speed = speed
+        self.sleep = sleep
+        self.requests = 0
+
+    def get(self, url, headers=None, params=None, timeout=None):
+        """Выдать следующий записанный ответ активного аккаунта."""
+        name = account_name()
+        queue = self.queues.get(name)
+        if not queue:
+            raise exceptions.ReplayExhausted(
+                f'Записанные ответы для аккаунта {name} закончились')
+        record = queue.popleft()
+        if self.speed > 0:
+            self.sleep(record['elapsed'] / self.speed)
+        self.requests += 1
+        return ReplayedResponse(record)
+
+    def stats(self):
+        """Счётчики запросов в формате PooledSession."""
+        return {'opened': 0, 'reused': 0, 'requests': self.requests,
+                'bytes': 0}
+
+    def close(self):
+        """Освободить записанные ответы."""
+        self.queues.clear()